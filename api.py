@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+HTTP API for bulk phonetization
+
+A small ASGI application around process_phrases, build_table and
+build_excel_table, for scripts and services that need more than the
+Streamlit UI. Phrases from concurrent requests are coalesced into batches,
+so out-of-vocabulary words of many requests are resolved together, and
+syllabification runs in a thread pool off the event loop. The lexicon is
+loaded once per worker process at startup.
+
+Every POST endpoint takes the same input: a JSON body {"lines": [...]} or
+{"text": "..."}, or a text/plain body, with one phrase per line in the
+input file format (`29 When the day is through`).
+
+Endpoints:
+    GET  /health    lexicon and cache status (503 once shut down)
+    POST /phrases   JSON: {"count": n, "phrases": [{"start", "text", "syllables"}]}
+    POST /stream    NDJSON, one phrase object per line, sent as each batch is done
+    POST /table     tab-separated table (same as the command line output)
+    POST /xlsx      formatted Excel workbook
+
+Usage:
+    python api.py                                 # http://127.0.0.1:8000
+    python api.py --host 0.0.0.0 --workers 4 --concurrency 2
+    uvicorn api:app --workers 4                   # configure with FONETIZER_API_* variables
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Tuple
+
+import fonetizer
+
+# Threads per worker process running syllabification batches
+DEFAULT_CONCURRENCY = int(os.environ.get('FONETIZER_API_CONCURRENCY', 2))
+
+# A batch is processed once it holds this many phrases...
+DEFAULT_BATCH_SIZE = int(os.environ.get('FONETIZER_API_BATCH_SIZE', 256))
+
+# ...or when its first phrase has waited this long
+DEFAULT_BATCH_WAIT_MS = float(os.environ.get('FONETIZER_API_BATCH_WAIT_MS', 2))
+
+# Phrases per NDJSON chunk on /stream
+STREAM_CHUNK = 100
+
+# Request limits
+MAX_BODY_BYTES = 5 * 1024 * 1024
+MAX_LINES = 20000
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class HTTPError(Exception):
+    """Error answered with a JSON {"error": message} body"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def process_batch(texts: List[str]) -> List[List[Tuple[str, str]]]:
+    """
+    Syllabify a batch of phrase texts (runs in the thread pool).
+
+    Every unique word of the batch is resolved once, out-of-vocabulary
+    words all together (see fonetizer.process_phrases).
+    """
+    return list(fonetizer.process_phrases(texts, batch_size=len(texts)))
+
+
+class PhraseBatcher:
+    """
+    Coalesces phrases from concurrent requests into batches.
+
+    A batch is sent to the executor when it reaches batch_size phrases or
+    batch_wait seconds after its first phrase arrived, whichever comes first.
+    Each caller gets back the syllables of its own phrases, in order.
+    """
+
+    def __init__(self, executor, batch_size: int = DEFAULT_BATCH_SIZE,
+                 batch_wait: float = DEFAULT_BATCH_WAIT_MS / 1000):
+        self.executor = executor
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._pending = []
+        self._pending_phrases = 0
+        self._timer = None
+        self.batches = 0
+        self.phrases = 0
+
+    async def process(self, texts: List[str]) -> List[List[Tuple[str, str]]]:
+        """Syllabify texts as part of the next batch"""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((texts, future))
+        self._pending_phrases += len(texts)
+        if self._pending_phrases >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        self._pending_phrases = 0
+        if not pending:
+            return
+
+        texts = [text for request_texts, _ in pending for text in request_texts]
+        self.batches += 1
+        self.phrases += len(texts)
+        batch = asyncio.get_running_loop().run_in_executor(self.executor, process_batch, texts)
+
+        def deliver(batch):
+            error = batch.exception()
+            results = None if error else batch.result()
+            offset = 0
+            for request_texts, future in pending:
+                if future.done():
+                    pass  # Caller went away
+                elif error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(results[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+        batch.add_done_callback(deliver)
+
+
+def parse_body(body: bytes, content_type: str) -> List[Tuple[str, str]]:
+    """
+    Parse a request body into (start_measure, text) phrases.
+
+    Raises:
+        HTTPError: On malformed JSON, missing input or too many lines
+    """
+    try:
+        if content_type.startswith('text/plain'):
+            lines = body.decode('utf-8').splitlines()
+        else:
+            data = json.loads(body or b'null')
+            if isinstance(data, dict) and isinstance(data.get('lines'), list):
+                lines = data['lines']
+            elif isinstance(data, dict) and isinstance(data.get('text'), str):
+                lines = data['text'].splitlines()
+            else:
+                raise HTTPError(400, 'Expected a JSON object with "lines" (list) or "text" (string)')
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HTTPError(400, f"Invalid request body: {e}")
+
+    if not all(isinstance(line, str) for line in lines):
+        raise HTTPError(400, '"lines" must be a list of strings')
+    phrases = list(fonetizer.iter_input_phrases(lines))
+    if not phrases:
+        raise HTTPError(400, "No phrases in request")
+    if len(phrases) > MAX_LINES:
+        raise HTTPError(413, f"Too many phrases ({len(phrases)} > {MAX_LINES})")
+    return phrases
+
+
+def phrase_json(start: str, text: str, syllables: List[Tuple[str, str]]) -> Dict[str, object]:
+    return {'start': start, 'text': text, 'syllables': [list(s) for s in syllables]}
+
+
+def encode_json(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+class FonetizerAPI:
+    """
+    The ASGI application.
+
+    Args:
+        concurrency: Threads running syllabification batches
+        batch_size: Max phrases per batch
+        batch_wait: Max seconds a phrase waits for its batch to fill up
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, batch_size: int = DEFAULT_BATCH_SIZE,
+                 batch_wait: float = DEFAULT_BATCH_WAIT_MS / 1000):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.executor = None
+        self.batcher = None
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('POST', '/phrases'): self.phrases,
+            ('POST', '/stream'): self.stream,
+            ('POST', '/table'): self.table,
+            ('POST', '/xlsx'): self.xlsx,
+        }
+
+    def startup(self):
+        """Load the lexicon and start the thread pool (idempotent)"""
+        fonetizer.get_lexicon()
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                               thread_name_prefix='fonetizer-api')
+            self.batcher = PhraseBatcher(self.executor, self.batch_size, self.batch_wait)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            self.batcher = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    self.startup()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        # Servers without lifespan support start the app on first request
+        if self.executor is None:
+            self.startup()
+
+        handler = self.routes.get((scope['method'], scope['path']))
+        response_started = False
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message['type'] == 'http.response.start':
+                response_started = True
+            await send(message)
+
+        try:
+            if handler is None:
+                if any(path == scope['path'] for _, path in self.routes):
+                    raise HTTPError(405, "Method not allowed")
+                raise HTTPError(404, "Not found")
+            await handler(scope, receive, tracked_send)
+        except Exception as e:
+            if response_started:
+                # Too late for an error response (e.g. halfway through
+                # /stream): let the server abort the connection, so the
+                # client sees a failed transfer instead of a short body
+                raise
+            if isinstance(e, HTTPError):
+                await respond(send, e.status, encode_json({'error': e.message}), 'application/json')
+            else:
+                await respond(send, 500, encode_json({'error': f"{type(e).__name__}: {e}"}), 'application/json')
+
+    async def _read_phrases(self, scope, receive) -> List[Tuple[str, str]]:
+        body = await read_body(receive)
+        headers = dict(scope.get('headers', []))
+        content_type = headers.get(b'content-type', b'application/json').decode('latin-1')
+        return parse_body(body, content_type)
+
+    async def _syllabify(self, phrases: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        return await self.batcher.process([text for _, text in phrases])
+
+    async def health(self, scope, receive, send):
+        batcher = self.batcher
+        if batcher is None:
+            # Shut down (lifespan shutdown) while the probe was on its way
+            await respond(send, 503, encode_json({'status': 'unavailable'}), 'application/json')
+            return
+        cache = fonetizer.word_cache_info()
+        await respond(send, 200, encode_json({
+            'status': 'ok',
+            'lexicon_words': len(fonetizer.get_lexicon()),
+            'word_cache': cache._asdict(),
+            'batches': batcher.batches,
+            'batched_phrases': batcher.phrases,
+        }), 'application/json')
+
+    async def phrases(self, scope, receive, send):
+        phrases = await self._read_phrases(scope, receive)
+        results = await self._syllabify(phrases)
+        await respond(send, 200, encode_json({
+            'count': len(phrases),
+            'phrases': [phrase_json(start, text, syllables)
+                        for (start, text), syllables in zip(phrases, results)],
+        }), 'application/json')
+
+    async def stream(self, scope, receive, send):
+        phrases = await self._read_phrases(scope, receive)
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'application/x-ndjson')],
+        })
+        for i in range(0, len(phrases), STREAM_CHUNK):
+            chunk = phrases[i:i + STREAM_CHUNK]
+            results = await self._syllabify(chunk)
+            lines = [encode_json(phrase_json(start, text, syllables)) + b'\n'
+                     for (start, text), syllables in zip(chunk, results)]
+            await send({'type': 'http.response.body', 'body': b''.join(lines), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    async def table(self, scope, receive, send):
+        phrases = await self._read_phrases(scope, receive)
+        results = await self._syllabify(phrases)
+        table = fonetizer.build_table([(start, syllables) for (start, _), syllables in zip(phrases, results)])
+        await respond(send, 200, table.encode('utf-8'), 'text/tab-separated-values; charset=utf-8')
+
+    async def xlsx(self, scope, receive, send):
+        phrases = await self._read_phrases(scope, receive)
+        results = await self._syllabify(phrases)
+        rows = [(start, syllables) for (start, _), syllables in zip(phrases, results)]
+        data = await asyncio.get_running_loop().run_in_executor(
+            self.executor, fonetizer.build_excel_table, rows
+        )
+        await respond(send, 200, data, XLSX_CONTENT_TYPE,
+                      [(b'content-disposition', b'attachment; filename="fonetisk_tabell.xlsx"')])
+
+
+async def read_body(receive) -> bytes:
+    """Read the whole request body, enforcing MAX_BODY_BYTES"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise HTTPError(400, "Client disconnected")
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request body over {MAX_BODY_BYTES} bytes")
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def respond(send, status: int, body: bytes, content_type: str, extra_headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode('latin-1')),
+                    (b'content-length', str(len(body)).encode('latin-1'))] + list(extra_headers),
+    })
+    await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+
+class Response(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    chunks: int
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class InProcessClient:
+    """
+    Calls an ASGI app directly, without a server or sockets.
+
+    Use as an async context manager to run the app's startup and shutdown:
+
+        async with InProcessClient(app) as client:
+            response = await client.request('POST', '/phrases', json={'lines': ['29 When the day']})
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lifespan_task = None
+
+    async def __aenter__(self):
+        self._to_app = asyncio.Queue()
+        self._from_app = asyncio.Queue()
+        self._lifespan_task = asyncio.ensure_future(
+            self.app({'type': 'lifespan', 'asgi': {'version': '3.0'}}, self._to_app.get, self._from_app.put)
+        )
+        await self._to_app.put({'type': 'lifespan.startup'})
+        message = await self._from_app.get()
+        if message['type'] != 'lifespan.startup.complete':
+            raise RuntimeError(f"App startup failed: {message.get('message')}")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._to_app.put({'type': 'lifespan.shutdown'})
+        await self._from_app.get()
+        await self._lifespan_task
+
+    async def request(self, method: str, path: str, body: bytes = b'', json=None,
+                      content_type: str = 'application/json') -> Response:
+        if json is not None:
+            body = encode_json(json)
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode('latin-1'),
+            'query_string': b'',
+            'headers': [(b'content-type', content_type.encode('latin-1'))],
+            'client': ('127.0.0.1', 0),
+            'server': ('in-process', 80),
+        }
+        request_messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+        async def receive():
+            if request_messages:
+                return request_messages.pop()
+            return {'type': 'http.disconnect'}
+
+        status = None
+        headers = {}
+        chunks = []
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                headers.update((k.decode('latin-1'), v.decode('latin-1')) for k, v in message['headers'])
+            elif message['type'] == 'http.response.body' and message.get('body'):
+                chunks.append(message['body'])
+
+        await self.app(scope, receive, send)
+        return Response(status, headers, b''.join(chunks), len(chunks))
+
+
+# Application instance for ASGI servers (uvicorn api:app)
+app = FonetizerAPI()
+
+
+def main():
+    """Serve the API with uvicorn"""
+    parser = argparse.ArgumentParser(description="Fonetizer HTTP API")
+    parser.add_argument('--host', default='127.0.0.1', help="Bind address (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8000, help="Port (default: 8000)")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes (default: 1)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Syllabification threads per worker (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Max phrases per batch (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--batch-wait-ms', type=float, default=DEFAULT_BATCH_WAIT_MS,
+                        help=f"Max wait for a batch to fill up (default: {DEFAULT_BATCH_WAIT_MS:g} ms)")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("Serving the API requires uvicorn: pip install uvicorn", file=sys.stderr)
+        sys.exit(1)
+
+    # Worker processes import api:app themselves and read their settings from here
+    os.environ['FONETIZER_API_CONCURRENCY'] = str(args.concurrency)
+    os.environ['FONETIZER_API_BATCH_SIZE'] = str(args.batch_size)
+    os.environ['FONETIZER_API_BATCH_WAIT_MS'] = str(args.batch_wait_ms)
+    uvicorn.run('api:app', host=args.host, port=args.port, workers=args.workers,
+                app_dir=os.path.dirname(os.path.abspath(__file__)))
+
+
+if __name__ == '__main__':
+    main()
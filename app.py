@@ -1,14 +1,154 @@
-import streamlit as st
-import tempfile
 import os
+import sys
+import json
+import time
+import difflib
+import logging
+from contextlib import contextmanager
+
+import streamlit as st
 
 # Import fonetizer functions
-from fonetizer import parse_input_line, process_phrase, build_excel_table
+from fonetizer import (
+    parse_input_line, process_phrase, prefetch_phrases, build_excel_table,
+    get_lexicon, word_cache_info, profiling,
+)
 
 # Version and copyright
 VERSION = "1.0.0"
 COPYRIGHT = "© 2025 Laura Mardones"
 
+# Cached phrase processing, shared by all sessions and reruns
+PHRASE_CACHE_SIZE = 5000
+
+
+@st.cache_resource
+def shared_lexicon():
+    """The compiled lexicon, loaded once per server process"""
+    return get_lexicon()
+
+
+@st.cache_resource
+def phrase_cache_stats():
+    """Lookup and miss counters for cached_process_phrase"""
+    return {'lookups': 0, 'misses': 0}
+
+
+def normalize_phrase(text: str) -> str:
+    """Cache key for a phrase: case and whitespace do not change the syllables"""
+    return ' '.join(text.lower().split())
+
+
+@st.cache_data(max_entries=PHRASE_CACHE_SIZE, show_spinner=False)
+def _process_normalized_phrase(normalized_text: str):
+    phrase_cache_stats()['misses'] += 1
+    return process_phrase(normalized_text)
+
+
+def cached_process_phrase(text: str):
+    """process_phrase with results cached across reruns and sessions"""
+    phrase_cache_stats()['lookups'] += 1
+    return _process_normalized_phrase(normalize_phrase(text))
+
+
+# Live preview: edits touching fewer lines than this are syllabified right
+# away, larger ones (long pastes) wait until the text has been left alone
+PREVIEW_DEBOUNCE_LINES = 50
+PREVIEW_DEBOUNCE_SECONDS = 1.0
+
+
+def diff_preview(old_lines, old_results, new_lines):
+    """
+    Carry preview results over from the previous run.
+
+    Args:
+        old_lines: Lines of the previous run
+        old_results: Their preview results (None = not yet processed)
+        new_lines: Lines of this run
+
+    Returns:
+        Results for new_lines, None for every inserted or edited line
+    """
+    results = [None] * len(new_lines)
+    matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            results[j1:j2] = old_results[i1:i2]
+    return results
+
+
+def process_preview_lines(lines, indexes, results):
+    """Parse and syllabify lines[i] for i in indexes into results (False = invalid line)"""
+    parsed = {}
+    for i in indexes:
+        try:
+            parsed[i] = parse_input_line(lines[i])
+        except ValueError:
+            results[i] = False
+    prefetch_phrases(text for _, text in parsed.values())
+    for i, (start, text) in parsed.items():
+        results[i] = (start, text, cached_process_phrase(text))
+
+
+def update_preview(preview, lines, force=False):
+    """
+    Bring the session's preview up to date with the text area.
+
+    Only lines changed since the previous run are processed. A change of
+    PREVIEW_DEBOUNCE_LINES or more lines is deferred until the text has been
+    unchanged for PREVIEW_DEBOUNCE_SECONDS (or force is set).
+
+    Returns:
+        True if lines are still waiting to be processed
+    """
+    if lines != preview['lines']:
+        preview['results'] = diff_preview(preview['lines'], preview['results'], lines)
+        preview['lines'] = lines
+        preview['changed_at'] = time.monotonic()
+
+    pending = [i for i, result in enumerate(preview['results']) if result is None]
+    if not pending:
+        return False
+    settled = time.monotonic() - preview['changed_at'] >= PREVIEW_DEBOUNCE_SECONDS
+    if len(pending) < PREVIEW_DEBOUNCE_LINES or settled or force:
+        process_preview_lines(lines, pending, preview['results'])
+        return False
+    return True
+
+
+def format_syllables(syllables):
+    """One phrase's syllables as consonant·vowel pairs"""
+    return '  '.join(f"{consonants}·{vowel}" for consonants, vowel in syllables)
+
+
+# Log pipeline metrics (stage times, counters) of every run that processes
+# phrases, when the server is started with FONETIZER_PROFILE=1
+PROFILE_REQUESTS = os.environ.get('FONETIZER_PROFILE', '') not in ('', '0')
+logger = logging.getLogger('fonetizer.app')
+if PROFILE_REQUESTS and not logger.handlers:
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+@contextmanager
+def request_metrics(action: str):
+    """Profile the with block and log its metrics (only if FONETIZER_PROFILE is set)"""
+    if not PROFILE_REQUESTS:
+        yield
+        return
+    t0 = time.perf_counter()
+    with profiling() as profiler:
+        try:
+            yield
+        finally:
+            metrics = profiler.snapshot()
+            if metrics['stages'] or metrics['counters']:
+                logger.info("%s %.1f ms %s", action, (time.perf_counter() - t0) * 1000,
+                            json.dumps(metrics))
+
+
 # Page config
 st.set_page_config(
     page_title="Fonetizer - Singing Phonetics for Barbershop",
@@ -17,6 +157,9 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Load the lexicon once for all sessions
+shared_lexicon()
+
 # CSS for better mobile experience
 st.markdown("""
 <style>
@@ -82,6 +225,7 @@ with st.expander("📖 Hur fungerar det? (Klicka för att läsa mer)"):
 
     **2. Kolla status**
     - Ser du "✅ X fraser redo att generera"? Då är allt OK!
+    - Förhandsvisningen visar stavelserna medan du redigerar
 
     **3. Ange filnamn**
     - Välj ett beskrivande namn för din tabell
@@ -136,6 +280,10 @@ if 'text_input_key' not in st.session_state:
     st.session_state.text_input_key = 0
 if 'generated_excel' not in st.session_state:
     st.session_state.generated_excel = None
+if 'preview' not in st.session_state:
+    st.session_state.preview = {'lines': [], 'results': [], 'changed_at': 0.0}
+if 'preview_timer' not in st.session_state:
+    st.session_state.preview_timer = False
 
 # Main input area
 col1, col2 = st.columns([5, 1])
@@ -197,6 +345,38 @@ if lines:
 else:
     st.info("Klistra in text i rutan ovan för att komma igång.")
 
+
+def render_preview():
+    """
+    Preview table; reruns on a timer while a long paste is debounced.
+
+    The only place the preview is updated: the rest of the page reads
+    st.session_state.preview and preview_timer as left here.
+    """
+    preview = st.session_state.preview
+    with request_metrics('preview'):
+        waiting = update_preview(preview, lines)
+    if waiting != st.session_state.preview_timer:
+        # A long paste started or finished waiting: rerun the page so the
+        # fragment is created with (or without) its timer
+        st.session_state.preview_timer = waiting
+        st.rerun()
+    if waiting:
+        st.caption(f"⏳ Förhandsvisningen uppdateras när du slutat skriva "
+                   f"({preview['results'].count(None)} rader väntar)")
+        return
+
+    rows = [{'Takt': result[0], 'Fras': result[1], 'Stavelser': format_syllables(result[2])}
+            for result in preview['results'] if result]
+    if rows:
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+
+
+if lines:
+    st.markdown("**Förhandsvisning**")
+    run_every = PREVIEW_DEBOUNCE_SECONDS if st.session_state.preview_timer else None
+    st.fragment(render_preview, run_every=run_every)()
+
 # Generate and download section
 st.subheader("3. Ange filnamn och generera")
 
@@ -230,33 +410,19 @@ if st.session_state.generated_excel is None:
     if generate_clicked and can_generate:
         with st.spinner("🎵 Genererar tabell..."):
             try:
-                # Parse all phrases
-                phrases = []
-                for line in lines:
-                    try:
-                        start, text = parse_input_line(line)
-                        syllables = process_phrase(text)
-                        phrases.append((start, syllables))
-                    except ValueError as e:
-                        st.error(f"❌ Fel i rad: {line}")
-                        st.stop()
-
-                # Generate Excel in memory
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-                    tmp_path = tmp.name
-
-                # Build Excel file (after closing the temp file)
-                build_excel_table(phrases, tmp_path)
-
-                # Read the file into memory
-                with open(tmp_path, 'rb') as f:
-                    excel_data = f.read()
-
-                # Clean up temp file
-                try:
-                    os.unlink(tmp_path)
-                except PermissionError:
-                    pass
+                # Reuse the preview (finishing any debounced lines), so only
+                # lines edited since the last preview are syllabified
+                preview = st.session_state.preview
+                with request_metrics('generate'):
+                    update_preview(preview, lines, force=True)
+                    for line, result in zip(lines, preview['results']):
+                        if not result:
+                            st.error(f"❌ Fel i rad: {line}")
+                            st.stop()
+                    phrases = [(start, syllables) for start, _, syllables in preview['results']]
+
+                    # Generate Excel in memory
+                    excel_data = build_excel_table(phrases)
 
                 # Store in session state with current filename and source text
                 st.session_state.generated_excel = {
@@ -288,6 +454,18 @@ else:
 
     st.info("💡 Tryck '🔄 Börja om' för att skapa en ny tabell")
 
+# Cache statistics (rendered last so they include this run)
+with st.sidebar:
+    st.markdown("---")
+    stats = phrase_cache_stats()
+    words = word_cache_info()
+    phrase_hits = stats['lookups'] - stats['misses']
+    st.caption(
+        f"**Cache** · fraser: {phrase_hits}/{stats['lookups']} träffar · "
+        f"ord: {words.hits}/{words.hits + words.misses} träffar, "
+        f"{words.size}/{words.maxsize} sparade"
+    )
+
 # Footer
 st.divider()
 st.markdown(
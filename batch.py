@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Batch conversion of many lyric files across CPU cores
+
+Fans the input files out over a process pool. The compiled lexicon is
+opened once in the parent before the pool starts, so forked workers share
+its memory map (on spawn platforms each worker opens it once in its
+initializer). Every input gets its own output; a failing file is reported
+and skipped without aborting the run.
+
+With --incremental a manifest of earlier results (see incremental.py) is
+kept, so only changed files, and in them only new phrases, are processed
+again and outputs are rewritten only when their table changed. --watch
+keeps polling the sources and rebuilds whatever changes.
+
+Usage:
+    python batch.py lyrics/                          # every *.txt, CSV next to each input
+    python batch.py "songs/**/*.txt" -o tables/ -f xlsx
+    python batch.py a.txt b.txt --jobs 4
+    python batch.py lyrics/ -o tables/ --incremental
+    python batch.py lyrics/ -o tables/ --watch
+"""
+
+import sys
+import os
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import fonetizer
+import incremental
+
+# Incremental builds hand new phrases to the process pool only from this
+# many on (fewer are done faster in-process than by starting workers)
+POOL_MIN_PHRASES = 2000
+
+# Seconds between two polls of the sources in watch mode
+WATCH_INTERVAL = 0.1
+
+
+class FileResult(NamedTuple):
+    input_path: str
+    output_path: str
+    phrases: int
+    seconds: float
+    error: Optional[str]
+
+
+def collect_inputs(sources: List[str], pattern: str = '*.txt') -> List[Tuple[str, str]]:
+    """
+    Expand directories, globs and plain file names into input files.
+
+    Returns:
+        Sorted, de-duplicated list of (input_path, root) where root is the
+        directory that relative output paths are computed from
+    """
+    found = {}
+    for source in sources:
+        if os.path.isdir(source):
+            for path in glob.glob(os.path.join(source, '**', pattern), recursive=True):
+                found.setdefault(path, source)
+        elif glob.has_magic(source):
+            for path in glob.glob(source, recursive=True):
+                if os.path.isfile(path):
+                    found.setdefault(path, os.path.dirname(path))
+        else:
+            found.setdefault(source, os.path.dirname(source))
+    return sorted(found.items())
+
+
+def output_path_for(input_path: str, root: str, output_dir: Optional[str], fmt: str) -> str:
+    """Output file for an input: same name with the format's extension,
+    mirrored under output_dir (if given) relative to root"""
+    stem = os.path.splitext(input_path)[0]
+    if output_dir is None:
+        return f"{stem}.{fmt}"
+    relative = os.path.relpath(stem, root or '.')
+    return os.path.join(output_dir, f"{relative}.{fmt}")
+
+
+def _init_worker():
+    # Open the lexicon and the G2P model once per worker (a no-op after
+    # fork, where the parent's memory maps are inherited)
+    fonetizer.get_lexicon()
+    fonetizer.get_g2p_model()
+
+
+def _convert(input_path: str, output_path: str) -> FileResult:
+    t0 = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        phrases = fonetizer.convert_file(input_path, output_path)
+        error = None
+    except Exception as e:
+        phrases = 0
+        error = f"{type(e).__name__}: {e}"
+    return FileResult(input_path, output_path, phrases, time.perf_counter() - t0, error)
+
+
+def run_batch(jobs_list: List[Tuple[str, str]], workers: Optional[int] = None, progress=None) -> List[FileResult]:
+    """
+    Convert (input_path, output_path) pairs in a process pool.
+
+    Args:
+        jobs_list: Files to convert
+        workers: Number of processes (default: CPU count)
+        progress: Optional callback called with each FileResult as it completes
+
+    Returns:
+        One FileResult per input, in completion order
+    """
+    # Load before forking so every worker shares the parent's mappings
+    fonetizer.get_lexicon()
+    fonetizer.get_g2p_model()
+
+    results = []
+    if workers == 1:
+        for input_path, output_path in jobs_list:
+            result = _convert(input_path, output_path)
+            results.append(result)
+            if progress:
+                progress(result)
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [executor.submit(_convert, input_path, output_path)
+                   for input_path, output_path in jobs_list]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if progress:
+                progress(result)
+    return results
+
+
+def _process_texts(texts: List[str]) -> List[List[Tuple[str, str]]]:
+    return list(fonetizer.process_phrases(texts, batch_size=max(len(texts), 1)))
+
+
+def pooled_processor(workers: Optional[int] = None) -> Callable[[List[str]], List[List[Tuple[str, str]]]]:
+    """
+    Phrase syllabifier for incremental.build(): large batches are split over
+    a process pool, small ones are processed in-process.
+    """
+    def process(texts: List[str]) -> List[List[Tuple[str, str]]]:
+        if workers == 1 or len(texts) < POOL_MIN_PHRASES:
+            return _process_texts(texts)
+        fonetizer.get_lexicon()
+        fonetizer.get_g2p_model()
+        count = workers or os.cpu_count() or 1
+        size = -(-len(texts) // count)
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        with ProcessPoolExecutor(max_workers=count, initializer=_init_worker) as executor:
+            return [syllables for chunk in executor.map(_process_texts, chunks) for syllables in chunk]
+    return process
+
+
+def run_incremental(jobs_list: List[Tuple[str, str]], manifest_path: str, workers: Optional[int] = None,
+                    progress=None) -> List[incremental.BuildResult]:
+    """
+    Bring the outputs of (input_path, output_path) pairs up to date using a manifest.
+
+    Args:
+        jobs_list: Files to convert (manifest entries of other files are dropped)
+        manifest_path: Manifest of earlier runs (created if missing)
+        workers: Processes for large batches of new phrases (default: CPU count)
+        progress: Optional callback called with each BuildResult, in input order
+
+    Returns:
+        One BuildResult per input, in input order
+    """
+    manifest = incremental.Manifest.load(manifest_path)
+    results = incremental.build(jobs_list, manifest, pooled_processor(workers))
+    manifest.forget_except(input_path for input_path, _ in jobs_list)
+    manifest.save()
+    if progress:
+        for result in results:
+            progress(result)
+    return results
+
+
+def watch(sources: List[str], pattern: str, output_dir: Optional[str], fmt: str, manifest_path: str,
+          workers: Optional[int] = None, interval: float = WATCH_INTERVAL, progress=None):
+    """
+    Poll the sources and rebuild the outputs of new or modified inputs until
+    interrupted.
+
+    Only files whose size or modification time changed since the last poll
+    are read; the manifest stays in memory between rebuilds and is saved
+    after each one.
+    """
+    manifest = incremental.Manifest.load(manifest_path)
+    process = pooled_processor(workers)
+    stamps = {}
+    while True:
+        inputs = collect_inputs(sources, pattern)
+        current = {}
+        for path, _ in inputs:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            current[path] = (st.st_size, st.st_mtime_ns)
+
+        changed = [(path, output_path_for(path, root, output_dir, fmt))
+                   for path, root in inputs if path in current and stamps.get(path) != current[path]]
+        if changed or current.keys() != stamps.keys():
+            t0 = time.perf_counter()
+            results = incremental.build(changed, manifest, process)
+            manifest.forget_except(current)
+            manifest.save()
+            if progress:
+                elapsed = time.perf_counter() - t0
+                for result in results:
+                    progress(result, elapsed)
+        stamps = current
+        time.sleep(interval)
+
+
+def main():
+    """Batch entry point"""
+    parser = argparse.ArgumentParser(description="Convert many lyric files to phonetic tables in parallel")
+    parser.add_argument('sources', nargs='+', help="Input files, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir', help="Directory for outputs (default: next to each input)")
+    parser.add_argument('-f', '--format', choices=['csv', 'xlsx', 'jsonl', 'fnsy'], default='csv',
+                        help="Output format: csv, xlsx, or the jsonl/fnsy exports (default: csv)")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--pattern', default='*.txt', help="File pattern inside directories (default: *.txt)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only report failures and the summary")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only reprocess changed files and phrases, keeping a manifest of earlier results")
+    parser.add_argument('--manifest', help="Manifest file for --incremental/--watch "
+                                           "(default: .fonetizer-manifest.json in the output directory)")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep polling the sources and rebuild changed files (implies --incremental)")
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL,
+                        help=f"Seconds between polls in --watch mode (default: {WATCH_INTERVAL})")
+    args = parser.parse_args()
+
+    manifest_path = args.manifest or os.path.join(args.output_dir or '.', incremental.MANIFEST_NAME)
+
+    if args.watch:
+        def report_rebuild(result: incremental.BuildResult, seconds: float):
+            if result.error:
+                print(f"FAILED {result.input_path}: {result.error}", file=sys.stderr)
+            elif result.status == 'written':
+                print(f"{time.strftime('%H:%M:%S')} {result.input_path} -> {result.output_path} "
+                      f"({result.reprocessed}/{result.phrases} phrases reprocessed, "
+                      f"{seconds * 1000:.0f} ms)", file=sys.stderr)
+
+        print(f"Watching {', '.join(args.sources)} (Ctrl+C to stop)", file=sys.stderr)
+        try:
+            watch(args.sources, args.pattern, args.output_dir, args.format, manifest_path,
+                  args.jobs, args.interval, report_rebuild)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    inputs = collect_inputs(args.sources, args.pattern)
+    if not inputs:
+        print("No input files found", file=sys.stderr)
+        sys.exit(1)
+
+    jobs_list = [(path, output_path_for(path, root, args.output_dir, args.format))
+                 for path, root in inputs]
+
+    def report(result: FileResult):
+        if result.error:
+            print(f"FAILED {result.input_path}: {result.error}", file=sys.stderr)
+        elif not args.quiet:
+            print(f"ok     {result.input_path} -> {result.output_path} "
+                  f"({result.phrases} phrases, {result.seconds * 1000:.0f} ms)", file=sys.stderr)
+
+    def report_build(result: incremental.BuildResult):
+        if result.error:
+            print(f"FAILED {result.input_path}: {result.error}", file=sys.stderr)
+        elif not args.quiet and result.status != 'unchanged':
+            print(f"{result.status:<10} {result.input_path} -> {result.output_path} "
+                  f"({result.reprocessed}/{result.phrases} phrases reprocessed)", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    if args.incremental:
+        results = run_incremental(jobs_list, manifest_path, args.jobs, report_build)
+    else:
+        results = run_batch(jobs_list, args.jobs, report)
+    elapsed = time.perf_counter() - t0
+
+    failed = [r for r in results if r.error]
+    phrases = sum(r.phrases for r in results)
+    print(f"{len(results) - len(failed)}/{len(results)} files converted, {len(failed)} failed, "
+          f"{phrases} phrases in {elapsed:.2f} s "
+          f"({len(results) / elapsed:.1f} files/s, {phrases / elapsed:.0f} phrases/s)", file=sys.stderr)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
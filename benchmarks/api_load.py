@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Load test: HTTP API latency
+
+Fires requests at the API with a fixed number of concurrent clients and
+reports throughput and p50/p90/p99/max latency. By default the app in
+api.py is called in-process (no server or sockets, measures the app
+itself); with --url the requests go to a running server over HTTP.
+
+Usage:
+    python benchmarks/api_load.py
+    python benchmarks/api_load.py --endpoint stream --lines 200 --concurrency 8
+    python api.py --workers 4 &  python benchmarks/api_load.py --url http://127.0.0.1:8000
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fonetizer
+import api
+
+
+def make_requests(count, lines_per_request, seed=11):
+    """Request bodies mixing example_input.txt lines with random lexicon words"""
+    rng = random.Random(seed)
+    with open(os.path.join(REPO_DIR, 'example_input.txt'), encoding='utf-8') as f:
+        examples = [line.strip() for line in f if line.strip()]
+    words = list(fonetizer.get_lexicon().words())[::25]
+    bodies = []
+    for _ in range(count):
+        lines = []
+        for measure in range(1, lines_per_request + 1):
+            if rng.random() < 0.5:
+                lines.append(rng.choice(examples))
+            else:
+                lines.append(f"{measure} " + ' '.join(rng.choice(words) for _ in range(rng.randint(2, 8))))
+        bodies.append(json.dumps({'lines': lines}).encode('utf-8'))
+    return bodies
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_in_process(path, bodies, concurrency, app):
+    latencies = []
+    errors = 0
+    queue = list(reversed(bodies))
+
+    async with api.InProcessClient(app) as client:
+        async def worker():
+            nonlocal errors
+            while queue:
+                body = queue.pop()
+                t0 = time.perf_counter()
+                response = await client.request('POST', path, body)
+                latencies.append(time.perf_counter() - t0)
+                errors += response.status != 200
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    return latencies, errors, elapsed
+
+
+def run_http(url, bodies, concurrency):
+    def call(body):
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                ok = response.status == 200
+        except OSError:
+            ok = False
+        return time.perf_counter() - t0, ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, bodies))
+    elapsed = time.perf_counter() - t0
+    return [latency for latency, _ in results], sum(not ok for _, ok in results), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fonetizer API load test")
+    parser.add_argument('--url', help="Base URL of a running server (default: call the app in-process)")
+    parser.add_argument('--endpoint', choices=['phrases', 'stream', 'table', 'xlsx'], default='phrases',
+                        help="Endpoint to load (default: phrases)")
+    parser.add_argument('--requests', type=int, default=500, help="Number of requests (default: 500)")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients (default: 16)")
+    parser.add_argument('--lines', type=int, default=20, help="Phrases per request (default: 20)")
+    parser.add_argument('--warmup', type=int, default=20, help="Unmeasured warm-up requests (default: 20)")
+    args = parser.parse_args()
+
+    bodies = make_requests(args.requests + args.warmup, args.lines)
+    warmup, bodies = bodies[:args.warmup], bodies[args.warmup:]
+    path = f"/{args.endpoint}"
+
+    if args.url:
+        url = args.url.rstrip('/') + path
+        run_http(url, warmup, args.concurrency)
+        latencies, errors, elapsed = run_http(url, bodies, args.concurrency)
+        target = url
+    else:
+        app = api.FonetizerAPI()
+        asyncio.run(run_in_process(path, warmup, args.concurrency, app))
+        latencies, errors, elapsed = asyncio.run(run_in_process(path, bodies, args.concurrency, app))
+        target = f"in-process {path} (concurrency {app.concurrency} threads)"
+
+    latencies.sort()
+    print(f"{target}: {len(latencies)} requests x {args.lines} phrases, {args.concurrency} clients")
+    print(f"  throughput  {len(latencies) / elapsed:8.1f} req/s  ({len(latencies) * args.lines / elapsed:.0f} phrases/s)")
+    for label, fraction in (('p50', 0.50), ('p90', 0.90), ('p99', 0.99)):
+        print(f"  {label}         {percentile(latencies, fraction) * 1000:8.1f} ms")
+    print(f"  max         {latencies[-1] * 1000:8.1f} ms")
+    print(f"  errors      {errors:8d}")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
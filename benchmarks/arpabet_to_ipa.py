@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: ARPABET -> IPA conversion and word resolution
+
+Compares the original arpabet_to_ipa (kept here as a reference copy, with
+its membership test and per-character stress fallback) with the interned
+symbol table in lexicon.py, over every pronunciation in CMU. Then compares
+resolving the words of a lyric-like token stream the old way (CMU dict plus
+conversion on every call) with the compiled lexicon and with text_to_ipa.
+
+Usage:
+    python benchmarks/arpabet_to_ipa.py
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cmudict
+import lexicon
+import fonetizer
+from lexicon import ARPABET_TO_IPA
+
+
+def reference_arpabet_to_ipa(arpabet_list):
+    """The original implementation, for comparison"""
+    ipa = ""
+    for phoneme in arpabet_list:
+        if phoneme in ARPABET_TO_IPA:
+            ipa += ARPABET_TO_IPA[phoneme]
+        else:
+            # Try without stress marker
+            base = ''.join([c for c in phoneme if not c.isdigit()])
+            if base in ARPABET_TO_IPA:
+                ipa += ARPABET_TO_IPA[base]
+    return ipa
+
+
+def best_of(func, repeat=5):
+    """Best wall time of func() in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def report(label, reference, optimized, count, unit):
+    print(f"{label}:")
+    print(f"  reference  {reference * 1000:8.1f} ms  ({reference / count * 1e9:6.0f} ns/{unit})")
+    print(f"  optimized  {optimized * 1000:8.1f} ms  ({optimized / count * 1e9:6.0f} ns/{unit})")
+    print(f"  speedup    {reference / optimized:8.2f}x")
+
+
+def main():
+    pronunciations = [arpabet for _, arpabet in cmudict.entries()]
+
+    # Same output for every CMU pronunciation (plus odd stress variants)
+    checked = pronunciations + [['AA3', 'K'], ['XX'], ['ER4', 'T'], []]
+    for arpabet in checked:
+        assert lexicon.arpabet_to_ipa(arpabet) == reference_arpabet_to_ipa(arpabet), arpabet
+    print(f"Output identical for {len(pronunciations)} pronunciations")
+
+    reference = best_of(lambda: [reference_arpabet_to_ipa(p) for p in pronunciations])
+    optimized = best_of(lambda: [lexicon.arpabet_to_ipa(p) for p in pronunciations])
+    report("arpabet_to_ipa over all of CMU", reference, optimized, len(pronunciations), "word")
+
+    # Lyric-like token stream: a small vocabulary repeated many times
+    cmu = cmudict.dict()
+    vocabulary = list(cmu)[::50]
+    tokens = [vocabulary[(i * 7919) % 400] for i in range(20000)] + vocabulary
+
+    reference = best_of(lambda: [reference_arpabet_to_ipa(cmu[w][0]) for w in tokens])
+
+    lex = lexicon.load_lexicon()
+    optimized = best_of(lambda: [lex.get(w) for w in tokens])
+    report("word resolution: CMU dict + convert vs compiled lexicon",
+           reference, optimized, len(tokens), "token")
+
+    fonetizer.text_to_ipa('warm')
+    optimized = best_of(lambda: [fonetizer.text_to_ipa(w) for w in tokens])
+    report("word resolution: CMU dict + convert vs text_to_ipa (word cache)",
+           reference, optimized, len(tokens), "token")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Excel output
+
+Compares the original build_excel_table (normal workbook, new Font/Border/
+Alignment objects for every cell and a final pass over all columns for the
+widths; kept here as a reference copy) with the write-only version in
+fonetizer.py. Reports wall time and peak Python memory (tracemalloc) for a
+synthetic songbook, and checks that both files look the same: cell values,
+fonts, alignment, borders and column widths.
+
+Usage:
+    python benchmarks/excel.py
+    python benchmarks/excel.py --phrases 2000
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fonetizer
+
+
+def reference_build_excel_table(phrases, output_path):
+    """The original build_excel_table (normal workbook, per-cell styles), for comparison"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, Border, Side
+
+    # Create workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Phonetic Table"
+
+    # Find maximum number of syllables (rows needed)
+    max_syllables = max(len(syllables) for _, syllables in phrases) if phrases else 0
+
+    # Border styles
+    thin_border = Side(style='thin', color='000000')
+    thick_border = Side(style='medium', color='000000')
+
+    # Build header row
+    header = ["Syllable"]
+    for start, _ in phrases:
+        header.extend([f"T{start}", ""])  # Only start measure on left column
+
+    ws.append(header)
+
+    # Format header row
+    for col_idx, cell in enumerate(ws[1], start=1):
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+
+        # Add top and bottom borders
+        if col_idx == 1:
+            # First column (Syllable)
+            cell.border = Border(
+                top=thick_border,
+                bottom=thick_border,
+                left=thick_border,
+                right=thin_border
+            )
+        else:
+            # Phrase columns - add thick border between pairs
+            is_first_in_pair = (col_idx - 2) % 2 == 0
+            is_last_in_pair = (col_idx - 2) % 2 == 1
+            is_last_column = col_idx == len(header)
+
+            left = thick_border if is_first_in_pair else thin_border
+            right = thick_border if (is_last_in_pair or is_last_column) else thin_border
+
+            cell.border = Border(
+                top=thick_border,
+                bottom=thick_border,
+                left=left,
+                right=right
+            )
+
+    # Build data rows
+    for syllable_idx in range(max_syllables):
+        row_data = [str(syllable_idx + 1)]
+
+        for _, syllables in phrases:
+            if syllable_idx < len(syllables):
+                consonant, vowel = syllables[syllable_idx]
+                row_data.append(consonant)
+                row_data.append(vowel)
+            else:
+                row_data.append("")  # Empty consonant
+                row_data.append("")  # Empty vowel
+
+        ws.append(row_data)
+
+        # Format data row
+        row_num = syllable_idx + 2  # +2 because header is row 1, and we're 0-indexed
+        for col_idx, cell in enumerate(ws[row_num], start=1):
+            is_last_row = syllable_idx == max_syllables - 1
+
+            if col_idx == 1:
+                # Syllable number column
+                cell.alignment = Alignment(horizontal='center', vertical='center')
+                bottom = thick_border if is_last_row else thin_border
+                cell.border = Border(
+                    top=thin_border,
+                    bottom=bottom,
+                    left=thick_border,
+                    right=thin_border
+                )
+            else:
+                # Phrase columns
+                is_consonant = (col_idx - 2) % 2 == 0
+                is_vowel = (col_idx - 2) % 2 == 1
+                is_first_in_pair = is_consonant
+                is_last_in_pair = is_vowel
+                is_last_column = col_idx == len(row_data)
+
+                # Alignment
+                if is_consonant:
+                    cell.alignment = Alignment(horizontal='right', vertical='center')
+                else:  # vowel
+                    cell.alignment = Alignment(horizontal='left', vertical='center')
+                    cell.font = Font(bold=True)  # Bold vowels
+
+                # Borders
+                left = thick_border if is_first_in_pair else thin_border
+                right = thick_border if (is_last_in_pair or is_last_column) else thin_border
+                bottom = thick_border if is_last_row else thin_border
+
+                cell.border = Border(
+                    top=thin_border,
+                    bottom=bottom,
+                    left=left,
+                    right=right
+                )
+
+    # Auto-adjust column widths
+    for col_idx, column in enumerate(ws.columns, start=1):
+        max_length = 0
+        column_letter = ws.cell(row=1, column=col_idx).column_letter
+
+        for cell in column:
+            try:
+                if cell.value:
+                    max_length = max(max_length, len(str(cell.value)))
+            except:
+                pass
+
+        adjusted_width = max(max_length + 2, 8)  # Minimum width of 8
+        ws.column_dimensions[column_letter].width = adjusted_width
+
+    # Save workbook
+    wb.save(output_path)
+
+
+def measure(build, phrases, path):
+    """Run build(phrases, path), return (seconds, peak MB)"""
+    t0 = time.perf_counter()
+    build(phrases, path)
+    elapsed = time.perf_counter() - t0
+
+    # Separate run for memory, tracemalloc slows everything down
+    tracemalloc.start()
+    build(phrases, path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def cell_look(cell):
+    border = cell.border
+    return (
+        cell.value or "",
+        bool(cell.font.b),
+        cell.alignment.horizontal,
+        cell.alignment.vertical,
+        tuple(getattr(border, side).style for side in ('left', 'right', 'top', 'bottom')),
+    )
+
+
+def assert_same_look(path_a, path_b):
+    """Fail unless both workbooks have the same values, styles and widths"""
+    from openpyxl import load_workbook
+
+    ws_a = load_workbook(path_a).active
+    ws_b = load_workbook(path_b).active
+    assert ws_a.title == ws_b.title
+    assert ws_a.max_row == ws_b.max_row and ws_a.max_column == ws_b.max_column
+    for row_a, row_b in zip(ws_a.iter_rows(), ws_b.iter_rows()):
+        for cell_a, cell_b in zip(row_a, row_b):
+            assert cell_look(cell_a) == cell_look(cell_b), (cell_a.coordinate, cell_look(cell_a), cell_look(cell_b))
+    for letter, dim in ws_a.column_dimensions.items():
+        assert dim.width == ws_b.column_dimensions[letter].width, letter
+
+
+def synthetic_phrases(count, seed=7):
+    """Songbook-like phrases built from example_input.txt lines"""
+    with open(os.path.join(REPO_DIR, 'example_input.txt'), encoding='utf-8') as f:
+        texts = [fonetizer.parse_input_line(line)[1] for line in f if line.strip()]
+    rng = random.Random(seed)
+    return [(str(i * 2 + 1), fonetizer.process_phrase(rng.choice(texts))) for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel writer benchmark")
+    parser.add_argument('--phrases', type=int, default=500, help="Phrases in the songbook (default: 500)")
+    args = parser.parse_args()
+
+    phrases = synthetic_phrases(args.phrases)
+    with tempfile.TemporaryDirectory() as tmp:
+        reference_path = os.path.join(tmp, 'reference.xlsx')
+        optimized_path = os.path.join(tmp, 'optimized.xlsx')
+
+        ref_time, ref_mem = measure(reference_build_excel_table, phrases, reference_path)
+        opt_time, opt_mem = measure(fonetizer.build_excel_table, phrases, optimized_path)
+
+        assert_same_look(reference_path, optimized_path)
+        print(f"Same values, styles and column widths ({args.phrases} phrases)")
+
+        print(f"  reference   {ref_time * 1000:8.0f} ms  peak {ref_mem:7.1f} MB  "
+              f"{os.path.getsize(reference_path) / 1024:6.0f} KB")
+        print(f"  write-only  {opt_time * 1000:8.0f} ms  peak {opt_mem:7.1f} MB  "
+              f"{os.path.getsize(optimized_path) / 1024:6.0f} KB")
+        print(f"  speedup     {ref_time / opt_time:8.2f}x  memory {ref_mem / opt_mem:.1f}x less")
+
+
+if __name__ == '__main__':
+    main()
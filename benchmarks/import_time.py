@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold `import fonetizer` time
+
+Imports fonetizer in fresh interpreters and fails (exit code 1) if the best
+time exceeds the budget, or if the import pulled in one of the heavy
+dependencies that should only load on first use.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 100 --runs 10
+"""
+
+import sys
+import os
+import argparse
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported by `import fonetizer`
+LAZY_MODULES = ['cmudict', 'eng_to_ipa', 'openpyxl']
+
+PROBE = f"""
+import sys, time
+t0 = time.perf_counter()
+import fonetizer
+elapsed = time.perf_counter() - t0
+loaded = [m for m in {LAZY_MODULES!r} if m in sys.modules]
+print(elapsed, ','.join(loaded))
+"""
+
+
+def measure_once() -> tuple:
+    """Import fonetizer in a fresh interpreter, return (seconds, eagerly loaded modules)"""
+    out = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    ).stdout.split()
+    elapsed = float(out[0])
+    loaded = out[1].split(',') if len(out) > 1 else []
+    return elapsed, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time benchmark for fonetizer")
+    parser.add_argument('--budget-ms', type=float, default=50.0,
+                        help="Fail if the best cold import is slower than this (default: 50)")
+    parser.add_argument('--runs', type=int, default=5, help="Number of fresh interpreters (default: 5)")
+    args = parser.parse_args()
+
+    times = []
+    loaded = []
+    for _ in range(args.runs):
+        elapsed, loaded = measure_once()
+        times.append(elapsed * 1000)
+
+    best = min(times)
+    print(f"import fonetizer: best {best:.1f} ms, median {sorted(times)[len(times) // 2]:.1f} ms "
+          f"over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(loaded)}")
+        failed = True
+    if best > args.budget_ms:
+        print(f"FAIL: cold import over budget ({best:.1f} ms > {args.budget_ms:.0f} ms)")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: per-stage timing of the phonetization pipeline
+
+Times each stage separately on synthetic corpora of example_input.txt-style
+lines (10 to 100k phrases by default):
+
+    lexicon_load         load_lexicon() in a fresh interpreter (cmudict import included)
+    text_to_ipa_cmu      text_to_ipa over the corpus tokens found in the lexicon, cold caches
+    text_to_ipa_oov      text_to_ipa over the out-of-vocabulary tokens (eng_to_ipa), cold caches
+    syllabify_phrase_ipa syllabify_phrase_ipa over every phrase's IPA
+    build_table          build_table over the processed corpus
+    build_excel_table    build_excel_table over the processed corpus, in memory (split into sheets)
+    process_lines        the whole text -> syllables pass, cold caches
+
+Results are written as JSON (--output). Given a previous result file
+(--baseline), every stage is compared with it and the run fails (exit code
+1) if one got slower than the threshold.
+
+Usage:
+    python benchmarks/pipeline.py --output bench.json
+    python benchmarks/pipeline.py --sizes 10,1000 --stages syllabify_phrase_ipa,build_table
+    python benchmarks/pipeline.py --baseline bench.json --threshold 0.15
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fonetizer
+
+STAGES = [
+    'lexicon_load', 'text_to_ipa_cmu', 'text_to_ipa_oov', 'syllabify_phrase_ipa',
+    'build_table', 'build_excel_table', 'process_lines',
+]
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+# Share of generated words that are not in the lexicon
+OOV_RATE = 0.02
+
+LEXICON_PROBE = """
+import sys, time
+t0 = time.perf_counter()
+import lexicon
+lexicon.load_lexicon()
+print(time.perf_counter() - t0)
+"""
+
+
+def pseudo_word(rng):
+    """A pronounceable made-up word (almost never in CMU)"""
+    syllables = rng.randint(2, 4)
+    return ''.join(rng.choice('bdfgklmnprstvz') + rng.choice('aeiou') + rng.choice(['', 'n', 'r', 'sk'])
+                   for _ in range(syllables))
+
+
+def synthetic_corpus(phrases, seed=3):
+    """
+    Lyric lines in the input file format ("N text").
+
+    Half the lines are example_input.txt lines, half are random lexicon
+    words; about OOV_RATE of the words come from a pool of made-up words.
+    """
+    rng = random.Random(seed)
+    with open(os.path.join(REPO_DIR, 'example_input.txt'), encoding='utf-8') as f:
+        examples = [fonetizer.parse_input_line(line)[1] for line in f if line.strip()]
+    lexicon = fonetizer.get_lexicon()
+    words = list(lexicon.words())[::40]
+    oov_pool = [w for w in (pseudo_word(rng) for _ in range(max(10, phrases // 50))) if w not in lexicon]
+
+    lines = []
+    for i in range(phrases):
+        if rng.random() < 0.5:
+            text = rng.choice(examples)
+        else:
+            text = ' '.join(rng.choice(oov_pool) if rng.random() < OOV_RATE else rng.choice(words)
+                            for _ in range(rng.randint(2, 9)))
+        lines.append(f"{i * 2 + 1} {text}")
+    return lines
+
+
+def cold_caches():
+    """Empty the in-memory caches (the persistent OOV cache is disabled in main)"""
+    fonetizer.clear_word_cache()
+    fonetizer.OOV_CACHE.clear()
+
+
+def best_of(func, repeat, setup=None):
+    """Best wall time of func() in seconds, calling setup() untimed before each run"""
+    best = float('inf')
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def time_lexicon_load(repeat):
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', LEXICON_PROBE], cwd=REPO_DIR,
+                             capture_output=True, text=True, check=True).stdout
+        times.append(float(out))
+    return min(times)
+
+
+def run_size(phrases, stages, repeat):
+    """Time the selected stages on a corpus of the given size, returns result records"""
+    lines = synthetic_corpus(phrases)
+    parsed = list(fonetizer.iter_input_phrases(lines))
+    texts = [text for _, text in parsed]
+    lexicon = fonetizer.get_lexicon()
+    tokens = [word for text in texts for word in fonetizer.tokenize_phrase(text)[0]]
+    cmu_tokens = [w for w in tokens if w in lexicon]
+    oov_tokens = [w for w in tokens if w not in lexicon]
+
+    results = []
+
+    def record(stage, seconds, items, unit, **extra):
+        results.append(dict(stage=stage, phrases=phrases, items=items, unit=unit, seconds=seconds,
+                            per_item_us=seconds / items * 1e6 if items else None, **extra))
+
+    if 'text_to_ipa_cmu' in stages:
+        seconds = best_of(lambda: [fonetizer.text_to_ipa(w) for w in cmu_tokens], repeat, cold_caches)
+        record('text_to_ipa_cmu', seconds, len(cmu_tokens), 'token')
+
+    if 'text_to_ipa_oov' in stages:
+        seconds = best_of(lambda: [fonetizer.text_to_ipa(w) for w in oov_tokens], repeat, cold_caches)
+        record('text_to_ipa_oov', seconds, len(oov_tokens), 'token',
+               unique=len(set(oov_tokens)))
+
+    # Inputs for the later stages, computed once untimed
+    phrase_ipas = [''.join(fonetizer.text_to_ipa(w) for w in fonetizer.tokenize_phrase(text)[0]) for text in texts]
+    processed = fonetizer.process_lines(lines)
+
+    if 'syllabify_phrase_ipa' in stages:
+        seconds = best_of(lambda: [fonetizer.syllabify_phrase_ipa(ipa, True) for ipa in phrase_ipas], repeat)
+        record('syllabify_phrase_ipa', seconds, len(phrase_ipas), 'phrase',
+               ipa_chars=sum(len(ipa) for ipa in phrase_ipas))
+
+    if 'build_table' in stages:
+        seconds = best_of(lambda: fonetizer.build_table(processed), repeat)
+        record('build_table', seconds, len(processed), 'phrase')
+
+    if 'build_excel_table' in stages:
+        seconds = best_of(lambda: fonetizer.build_excel_table(processed), repeat)
+        record('build_excel_table', seconds, len(processed), 'phrase',
+               sheets=len(fonetizer.excel_sheets(processed.starts)))
+
+    if 'process_lines' in stages:
+        seconds = best_of(lambda: fonetizer.process_lines(lines), repeat, cold_caches)
+        record('process_lines', seconds, len(lines), 'phrase')
+
+    return results
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """
+    Compare results with a baseline run, print a table of ratios.
+
+    Returns:
+        List of (stage, phrases, ratio) that are slower than 1 + threshold.
+        Stages faster than min_seconds in both runs are reported but not gated.
+    """
+    previous = {(r['stage'], r['phrases']): r for r in baseline['results']}
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('timestamp', 'baseline')} (threshold +{threshold:.0%}):")
+    for result in results:
+        key = (result['stage'], result['phrases'])
+        if key not in previous:
+            continue
+        old = previous[key]['seconds']
+        ratio = result['seconds'] / old if old else float('inf')
+        gated = max(old, result['seconds']) >= min_seconds
+        slow = gated and ratio > 1 + threshold
+        status = "SLOWER" if slow else ("ok" if gated else "ok (too short to gate)")
+        print(f"  {result['stage']:<22}{result['phrases']:>8}  {old * 1000:10.2f} -> "
+              f"{result['seconds'] * 1000:10.2f} ms  {ratio:6.2f}x  {status}")
+        if slow:
+            regressions.append((result['stage'], result['phrases'], ratio))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage benchmark of the phonetization pipeline")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated corpus sizes in phrases (default: 10,100,1000,10000,100000)")
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help="Comma-separated stages to run (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement, best is kept (default: 3)")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Previous JSON results to compare with")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Allowed slowdown vs the baseline as a fraction (default: 0.10)")
+    parser.add_argument('--min-seconds', type=float, default=0.005,
+                        help="Don't gate on measurements shorter than this (default: 0.005)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    stages = args.stages.split(',')
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+
+    # Measure eng_to_ipa itself, not an earlier run's on-disk results
+    fonetizer.set_persistent_oov_cache(None)
+
+    results = []
+    if 'lexicon_load' in stages:
+        seconds = time_lexicon_load(args.repeat)
+        results.append(dict(stage='lexicon_load', phrases=0, items=1, unit='load', seconds=seconds,
+                            per_item_us=seconds * 1e6))
+
+    for size in sizes:
+        print(f"Corpus of {size} phrases...", file=sys.stderr)
+        results.extend(run_size(size, stages, args.repeat))
+
+    print(f"{'stage':<22}{'phrases':>8}{'items':>10}{'total ms':>12}{'us/item':>10}")
+    for r in results:
+        per_item = f"{r['per_item_us']:10.2f}" if r['per_item_us'] is not None else f"{'-':>10}"
+        print(f"{r['stage']:<22}{r['phrases']:>8}{r['items']:>10}{r['seconds'] * 1000:12.2f}{per_item}")
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"FAIL: {len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark: phrase syllabification
+
+Checks that the single-pass syllabify_phrase_ipa gives exactly the same
+output as the original two-stage implementation (find_vowel_positions plus
+per-gap consonant scans, kept here as a reference copy) on example_input.txt,
+on every phrase of a generated corpus and on random IPA strings, reports
+agreement of the example table with facit.txt, and times both on long
+phrases.
+
+Usage:
+    python benchmarks/syllabify.py
+    python benchmarks/syllabify.py --phrase-words 2000
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fonetizer
+from fonetizer import DIPHTHONGS, VOWELS, CONSONANTS
+
+
+def reference_find_vowel_positions(ipa):
+    """The original vowel scanner, for comparison"""
+    vowels = []
+    i = 0
+    while i < len(ipa):
+        if ipa[i] in VOWELS:
+            start = i
+            vowel = ipa[i]
+            i += 1
+            if i < len(ipa) and ipa[i] in VOWELS:
+                potential_diphthong = vowel + ipa[i]
+                if potential_diphthong in DIPHTHONGS:
+                    vowel = potential_diphthong
+                    i += 1
+            if i < len(ipa) and ipa[i] == "ː":
+                vowel += ipa[i]
+                i += 1
+            vowels.append((start, i, vowel))
+        else:
+            i += 1
+    return vowels
+
+
+def reference_syllabify(phrase_ipa, is_phrase_final):
+    """The original syllabifier, for comparison"""
+    if not phrase_ipa:
+        return []
+    vowel_positions = reference_find_vowel_positions(phrase_ipa)
+    if not vowel_positions:
+        return []
+    syllables = []
+    for vowel_idx, (vowel_start, vowel_end, vowel) in enumerate(vowel_positions):
+        cons_start = 0 if vowel_idx == 0 else vowel_positions[vowel_idx - 1][1]
+        consonants = ""
+        for i in range(cons_start, vowel_start):
+            if phrase_ipa[i] in CONSONANTS:
+                consonants += phrase_ipa[i]
+        if vowel in DIPHTHONGS:
+            long_v, glide = DIPHTHONGS[vowel]
+            syllables.append((consonants, long_v))
+            syllables.append(("", glide))
+        else:
+            syllables.append((consonants, vowel))
+    if is_phrase_final:
+        final_consonants = ""
+        for i in range(vowel_positions[-1][1], len(phrase_ipa)):
+            if phrase_ipa[i] in CONSONANTS:
+                final_consonants += phrase_ipa[i]
+        if final_consonants:
+            syllables.append((final_consonants, ""))
+    return syllables
+
+
+def phrase_ipa_of(text):
+    return ''.join(fonetizer.text_to_ipa(word) for word in text.split())
+
+
+def check_equivalence(phrases_ipa):
+    for ipa in phrases_ipa:
+        for final in (False, True):
+            expected = reference_syllabify(ipa, final)
+            actual = fonetizer.syllabify_phrase_ipa(ipa, final)
+            assert actual == expected, (ipa, final, actual, expected)
+
+
+def facit_agreement():
+    """Compare the example table with facit.txt cell by cell"""
+    with open(os.path.join(REPO_DIR, 'example_input.txt'), encoding='utf-8') as f:
+        parsed = [fonetizer.parse_input_line(line) for line in f if line.strip()]
+    phrases = [(start, fonetizer.process_phrase(text)) for start, text in parsed]
+    ours = [row.split('\t')[1:] for row in fonetizer.build_table(phrases).split('\n')[1:]]
+
+    with open(os.path.join(REPO_DIR, 'facit.txt'), encoding='utf-8') as f:
+        facit = [line.rstrip('\n').split('    ')[1:] for line in f.readlines()[1:]]
+
+    total = agree = 0
+    for row_idx in range(max(len(ours), len(facit))):
+        our_row = ours[row_idx] if row_idx < len(ours) else []
+        facit_row = facit[row_idx] if row_idx < len(facit) else []
+        for col_idx in range(max(len(our_row), len(facit_row))):
+            a = our_row[col_idx] if col_idx < len(our_row) else ''
+            b = facit_row[col_idx] if col_idx < len(facit_row) else ''
+            if a or b:
+                total += 1
+                agree += a == b
+    return agree, total
+
+
+def best_of(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Syllabifier equivalence check and benchmark")
+    parser.add_argument('--phrase-words', type=int, default=1000,
+                        help="Words per long benchmark phrase (default: 1000)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    words = list(fonetizer.get_lexicon().words())
+
+    with open(os.path.join(REPO_DIR, 'example_input.txt'), encoding='utf-8') as f:
+        example = [fonetizer.parse_input_line(line)[1] for line in f if line.strip()]
+    corpus = [' '.join(rng.choice(words) for _ in range(rng.randint(1, 12))) for _ in range(2000)]
+    alphabet = ''.join(sorted(VOWELS | CONSONANTS)) + "ˈˌ'- 0"
+    fuzz = [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) for _ in range(20000)]
+
+    check_equivalence([phrase_ipa_of(text) for text in example + corpus] + fuzz)
+    print(f"Output identical on {len(example)} example, {len(corpus)} corpus and {len(fuzz)} random phrases")
+
+    agree, total = facit_agreement()
+    print(f"facit.txt agreement: {agree}/{total} non-empty cells (same for both implementations)")
+
+    long_ipa = phrase_ipa_of(' '.join(rng.choice(words) for _ in range(args.phrase_words)))
+    reference = best_of(lambda: reference_syllabify(long_ipa, True))
+    optimized = best_of(lambda: fonetizer.syllabify_phrase_ipa(long_ipa, True))
+    print(f"Long phrase ({args.phrase_words} words, {len(long_ipa)} IPA chars):")
+    print(f"  reference   {reference * 1000:8.2f} ms")
+    print(f"  single-pass {optimized * 1000:8.2f} ms")
+    print(f"  speedup     {reference / optimized:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory of syllabified corpora
+
+Compares the retained memory (tracemalloc) of a synthetic corpus kept as a
+list of (start, [(consonant, vowel), ...]) with the same corpus in a
+SyllableTable, checks that both give the same table, and times build_table
+on each.
+
+Usage:
+    python benchmarks/syllable_memory.py
+    python benchmarks/syllable_memory.py --phrases 100000
+"""
+
+import sys
+import os
+import gc
+import time
+import argparse
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fonetizer
+from fonetizer import SyllableTable
+from pipeline import synthetic_corpus
+
+
+def retained(build):
+    """Result of build() and the memory it still holds afterwards"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def best_of(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SyllableTable memory benchmark")
+    parser.add_argument('--phrases', type=int, default=20000, help="Corpus size (default: 20000)")
+    args = parser.parse_args()
+
+    parsed = list(fonetizer.iter_input_phrases(synthetic_corpus(args.phrases)))
+    texts = [text for _, text in parsed]
+    starts = [start for start, _ in parsed]
+    # Warm the word cache so both builds only pay for syllabification
+    for _ in fonetizer.process_phrases(texts):
+        pass
+
+    tuples, tuples_bytes = retained(
+        lambda: list(zip(starts, fonetizer.process_phrases(texts))))
+    table, table_bytes = retained(
+        lambda: SyllableTable.from_phrases(zip(starts, fonetizer.process_phrases(texts))))
+
+    assert table == tuples
+    assert fonetizer.build_table(table) == fonetizer.build_table(tuples)
+    syllables = len(table.consonants)
+    print(f"{len(table)} phrases, {syllables} syllables, {len(table.symbols)} distinct symbols")
+    print(f"  list of tuples  {tuples_bytes / 1e6:8.1f} MB  ({tuples_bytes / syllables:5.1f} B/syllable)")
+    print(f"  SyllableTable   {table_bytes / 1e6:8.1f} MB  ({table_bytes / syllables:5.1f} B/syllable)")
+    print(f"  reduction       {tuples_bytes / table_bytes:8.1f}x")
+
+    reference = best_of(lambda: fonetizer.build_table(tuples))
+    compact = best_of(lambda: fonetizer.build_table(table))
+    print("build_table:")
+    print(f"  from tuples     {reference * 1000:8.1f} ms  (converted to a table first)")
+    print(f"  from table      {compact * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,428 @@
+"""
+Machine-readable exports of syllabified phrases
+
+The tab-separated table and the Excel workbook are laid out for singers:
+phrases are columns, so reading one phrase back means parsing the whole
+file. These formats store one record per phrase, in input order, are
+written as phrases come in, and have readers that decode only the phrases
+asked for.
+
+JSON Lines (.jsonl)
+    One object per line, as in the HTTP API:
+        {"start": "29", "syllables": [["w", "ɛ"], ["n", "ə"], ...]}
+    With the word alignment (fonetizer.WordAlignment) there are three more
+    keys: "text", "words" ([start, end] of each word in text) and
+    "alignment" ([first, last] word of each syllable).
+    JsonlReader finds the line starts with a newline scan (no JSON parsing)
+    and decodes a line when its phrase is read.
+
+Binary (.fnsy, little-endian)
+    header   magic "FNSY", format version (uint32): 1, or 2 with alignment
+    records  per phrase: payload size (uint32), then the payload:
+             start measure (uint8 length + UTF-8), syllable count (uint16),
+             consonant id and vowel id per syllable (uint16 each)
+             version 2 only: text (uint32 length + UTF-8), word count
+             (uint16), start and end per word (uint32 each), first and
+             last word per syllable (uint16 each)
+    symbols  count (uint32), then per symbol uint8 length + UTF-8
+    index    offset of each record (uint64)
+    footer   symbols offset, index offset (uint64), phrase count (uint32),
+             magic "FNSY"
+    Consonant clusters and vowels are interned as in SyllableTable, so a
+    syllable costs 4 bytes. The symbol table and index go last, which is
+    what lets the writer stream; BinaryReader maps the file and seeks to a
+    phrase through the index.
+
+Phrases to write are (start, syllables) pairs, or (start, syllables,
+alignment) triples as given by fonetizer.iter_syllabified(..., align=True).
+Readers give (start, syllables); reader.alignment(i) the alignment, if the
+file has one.
+
+Usage:
+    with open('song.fnsy', 'wb') as f:
+        write_binary(phrases, f)
+    with open_export('song.fnsy') as reader:
+        start, syllables = reader[41]
+        alignment = reader.alignment(41)
+"""
+
+import sys
+import json
+import mmap
+import struct
+from abc import ABC, abstractmethod
+from array import array
+from typing import BinaryIO, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from fonetizer import WordAlignment
+from syllable_table import SyllableTable
+
+BINARY_MAGIC = b'FNSY'
+BINARY_VERSION = 1
+BINARY_VERSION_ALIGNED = 2
+BINARY_HEADER = struct.Struct('<4sI')
+BINARY_FOOTER = struct.Struct('<QQI4s')
+RECORD_SIZE = struct.Struct('<I')
+
+# Largest symbol id, syllable and word count a binary record can hold
+MAX_SYMBOLS = 0xFFFF
+MAX_SYLLABLES = 0xFFFF
+MAX_WORDS = 0xFFFF
+
+# Output file extension -> format
+EXPORT_FORMATS = {'.jsonl': 'jsonl', '.fnsy': 'binary'}
+
+
+class JsonlWriter:
+    """Write phrases as JSON Lines, one line per write()"""
+
+    def __init__(self, out: TextIO):
+        self.out = out
+        self.count = 0
+
+    def write(self, start: str, syllables: Iterable[Tuple[str, str]],
+              alignment: Optional[WordAlignment] = None):
+        record = {'start': start, 'syllables': [[consonant, vowel] for consonant, vowel in syllables]}
+        if alignment is not None:
+            record['text'] = alignment.text
+            record['words'] = alignment.spans
+            record['alignment'] = alignment.syllables
+        self.out.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.count += 1
+
+    def close(self):
+        """Nothing to finish (for symmetry with BinaryWriter); the stream stays open"""
+
+
+class BinaryWriter:
+    """
+    Write phrases in the binary format, one record per write().
+
+    close() writes the symbol table, index and footer; the file is not
+    readable before that. The stream is never seeked, so it can be a pipe.
+    With aligned=True every write() must come with an alignment, which is
+    stored in the record (format version 2).
+    """
+
+    def __init__(self, out: BinaryIO, aligned: bool = False):
+        self.out = out
+        self.aligned = aligned
+        self.count = 0
+        self._offsets = array('Q')
+        self._symbols: List[str] = ['']
+        self._symbol_ids = {'': 0}
+        self._position = BINARY_HEADER.size
+        out.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION_ALIGNED if aligned else BINARY_VERSION))
+
+    def _intern(self, symbol: str) -> int:
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self._symbols)
+            if symbol_id > MAX_SYMBOLS:
+                raise ValueError(f"More than {MAX_SYMBOLS} distinct consonant clusters and vowels")
+            if len(symbol.encode('utf-8')) > 255:
+                raise ValueError(f"Consonant cluster or vowel longer than 255 bytes: {symbol[:20]!r}...")
+            self._symbols.append(symbol)
+            self._symbol_ids[symbol] = symbol_id
+        return symbol_id
+
+    def write(self, start: str, syllables: Iterable[Tuple[str, str]],
+              alignment: Optional[WordAlignment] = None):
+        intern = self._intern
+        ids = array('H')
+        for consonant, vowel in syllables:
+            ids.append(intern(consonant))
+            ids.append(intern(vowel))
+        if len(ids) // 2 > MAX_SYLLABLES:
+            raise ValueError(f"Phrase with more than {MAX_SYLLABLES} syllables")
+        if sys.byteorder != 'little':
+            ids.byteswap()
+        start_bytes = start.encode('utf-8')
+        if len(start_bytes) > 255:
+            raise ValueError(f"Start measure longer than 255 bytes: {start[:20]!r}...")
+        parts = [bytes([len(start_bytes)]), start_bytes, struct.pack('<H', len(ids) // 2), ids.tobytes()]
+        if self.aligned:
+            if alignment is None:
+                raise ValueError("Phrase without an alignment written to an aligned binary export")
+            parts.extend(_pack_alignment(alignment))
+        payload = b''.join(parts)
+        self._offsets.append(self._position)
+        self.out.write(RECORD_SIZE.pack(len(payload)) + payload)
+        self._position += RECORD_SIZE.size + len(payload)
+        self.count += 1
+
+    def close(self):
+        """Write the symbol table, index and footer (the stream stays open)"""
+        symbols_offset = self._position
+        parts = [struct.pack('<I', len(self._symbols))]
+        for symbol in self._symbols:
+            encoded = symbol.encode('utf-8')
+            parts.append(bytes([len(encoded)]) + encoded)
+        symbols = b''.join(parts)
+        index = self._offsets
+        if sys.byteorder != 'little':
+            index = array('Q', index)
+            index.byteswap()
+        index_offset = symbols_offset + len(symbols)
+        self.out.write(symbols)
+        self.out.write(index.tobytes())
+        self.out.write(BINARY_FOOTER.pack(symbols_offset, index_offset, self.count, BINARY_MAGIC))
+
+
+def _pack_alignment(alignment: WordAlignment) -> List[bytes]:
+    """The version 2 part of a binary record"""
+    if len(alignment.spans) > MAX_WORDS:
+        raise ValueError(f"Phrase with more than {MAX_WORDS} words")
+    text = alignment.text.encode('utf-8')
+    spans = array('I', [offset for span in alignment.spans for offset in span])
+    words = array('H', [index for pair in alignment.syllables for index in pair])
+    if sys.byteorder != 'little':
+        spans.byteswap()
+        words.byteswap()
+    return [struct.pack('<I', len(text)), text, struct.pack('<H', len(alignment.spans)),
+            spans.tobytes(), words.tobytes()]
+
+
+def write_jsonl(phrases: Iterable[Tuple], out: TextIO) -> int:
+    """
+    Write (start_measure, syllables[, alignment]) tuples as JSON Lines, as
+    they come.
+
+    Returns:
+        Number of phrases written
+    """
+    writer = JsonlWriter(out)
+    for phrase in phrases:
+        writer.write(*phrase)
+    writer.close()
+    return writer.count
+
+
+def write_binary(phrases: Iterable[Tuple], out: BinaryIO, aligned: bool = False) -> int:
+    """
+    Write (start_measure, syllables[, alignment]) tuples in the binary
+    format, as they come.
+
+    Args:
+        phrases: Phrases to write
+        out: Binary stream
+        aligned: Store the alignments (every phrase must have one)
+
+    Returns:
+        Number of phrases written
+    """
+    writer = BinaryWriter(out, aligned)
+    for phrase in phrases:
+        writer.write(*phrase)
+    writer.close()
+    return writer.count
+
+
+class _IndexedReader(ABC):
+    """Common part of the readers: random access by phrase index over a memory map"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                self._mm = b''
+
+    @abstractmethod
+    def _read(self, index: int) -> Tuple[str, List[Tuple[str, str]]]:
+        """(start, syllables) of phrase index (0 <= index < len(self))"""
+
+    @abstractmethod
+    def _read_alignment(self, index: int) -> Optional[WordAlignment]:
+        """Word alignment of phrase index (0 <= index < len(self)), or None"""
+
+    def alignment(self, index: int) -> Optional[WordAlignment]:
+        """Word alignment of phrase index, None if it was written without one"""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("phrase index out of range")
+        return self._read_alignment(index)
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of phrases in the file"""
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._read(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("phrase index out of range")
+        return self._read(index)
+
+    def __iter__(self) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+        for i in range(len(self)):
+            yield self._read(i)
+
+    def to_table(self) -> SyllableTable:
+        """All phrases as a SyllableTable (e.g. for build_table)"""
+        return SyllableTable.from_phrases(self)
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JsonlReader(_IndexedReader):
+    """
+    Random access to a JSON Lines export.
+
+    Opening scans for line starts only; reader[i] parses line i alone.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        mm = self._mm
+        starts = array('Q')
+        pos = 0
+        end = len(mm)
+        while pos < end:
+            newline = mm.find(b'\n', pos)
+            if newline < 0:
+                newline = end
+            if newline > pos:
+                starts.append(pos)
+            pos = newline + 1
+        starts.append(end + 1)
+        self._starts = starts
+
+    def __len__(self) -> int:
+        return len(self._starts) - 1
+
+    def _record(self, index: int) -> dict:
+        begin = self._starts[index]
+        end = self._mm.find(b'\n', begin)
+        if end < 0:
+            end = len(self._mm)
+        return json.loads(self._mm[begin:end])
+
+    def _read(self, index: int) -> Tuple[str, List[Tuple[str, str]]]:
+        record = self._record(index)
+        return record['start'], [(consonant, vowel) for consonant, vowel in record['syllables']]
+
+    def _read_alignment(self, index: int) -> Optional[WordAlignment]:
+        record = self._record(index)
+        if 'alignment' not in record:
+            return None
+        return WordAlignment(record['text'], [tuple(span) for span in record['words']],
+                             [tuple(pair) for pair in record['alignment']])
+
+
+class BinaryReader(_IndexedReader):
+    """
+    Random access to a binary export.
+
+    Opening reads the footer and the symbol table; reader[i] follows the
+    index to record i and decodes it alone.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        mm = self._mm
+        if len(mm) < BINARY_HEADER.size + BINARY_FOOTER.size:
+            self.close()
+            raise ValueError(f"Not a Fonetizer binary export: {path}")
+        magic, version = BINARY_HEADER.unpack_from(mm, 0)
+        symbols_offset, index_offset, count, end_magic = BINARY_FOOTER.unpack_from(mm, len(mm) - BINARY_FOOTER.size)
+        if (magic != BINARY_MAGIC or end_magic != BINARY_MAGIC
+                or version not in (BINARY_VERSION, BINARY_VERSION_ALIGNED)):
+            self.close()
+            raise ValueError(f"Not a Fonetizer binary export (format {BINARY_VERSION} or "
+                             f"{BINARY_VERSION_ALIGNED}), or not closed properly: {path}")
+        if index_offset + 8 * count + BINARY_FOOTER.size != len(mm):
+            self.close()
+            raise ValueError(f"Truncated Fonetizer binary export: {path}")
+
+        self.aligned = version == BINARY_VERSION_ALIGNED
+        self.count = count
+        self._offsets = struct.unpack_from(f'<{count}Q', mm, index_offset)
+
+        symbols = []
+        (symbol_count,) = struct.unpack_from('<I', mm, symbols_offset)
+        pos = symbols_offset + 4
+        for _ in range(symbol_count):
+            length = mm[pos]
+            symbols.append(mm[pos + 1:pos + 1 + length].decode('utf-8'))
+            pos += 1 + length
+        self.symbols = symbols
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _read(self, index: int) -> Tuple[str, List[Tuple[str, str]]]:
+        mm = self._mm
+        pos = self._offsets[index] + RECORD_SIZE.size
+        length = mm[pos]
+        start = mm[pos + 1:pos + 1 + length].decode('utf-8')
+        pos += 1 + length
+        (syllable_count,) = struct.unpack_from('<H', mm, pos)
+        ids = struct.unpack_from(f'<{2 * syllable_count}H', mm, pos + 2)
+        symbols = self.symbols
+        return start, [(symbols[ids[i]], symbols[ids[i + 1]]) for i in range(0, len(ids), 2)]
+
+    def _read_alignment(self, index: int) -> Optional[WordAlignment]:
+        if not self.aligned:
+            return None
+        mm = self._mm
+        pos = self._offsets[index] + RECORD_SIZE.size
+        pos += 1 + mm[pos]
+        (syllable_count,) = struct.unpack_from('<H', mm, pos)
+        pos += 2 + 4 * syllable_count
+        (length,) = struct.unpack_from('<I', mm, pos)
+        text = mm[pos + 4:pos + 4 + length].decode('utf-8')
+        pos += 4 + length
+        (word_count,) = struct.unpack_from('<H', mm, pos)
+        offsets = struct.unpack_from(f'<{2 * word_count}I', mm, pos + 2)
+        pos += 2 + 8 * word_count
+        words = struct.unpack_from(f'<{2 * syllable_count}H', mm, pos)
+        return WordAlignment(text, list(zip(offsets[::2], offsets[1::2])), list(zip(words[::2], words[1::2])))
+
+
+def export_format(path: str) -> str:
+    """'jsonl' or 'binary' from the file extension, ValueError for anything else"""
+    for extension, fmt in EXPORT_FORMATS.items():
+        if path.endswith(extension):
+            return fmt
+    raise ValueError(f"Not an export file (expected {' or '.join(EXPORT_FORMATS)}): {path}")
+
+
+def open_export(path: str) -> _IndexedReader:
+    """Open a .jsonl or .fnsy export for reading"""
+    if export_format(path) == 'jsonl':
+        return JsonlReader(path)
+    return BinaryReader(path)
+
+
+def write_export(phrases: Iterable[Tuple], path: str, aligned: bool = False) -> int:
+    """
+    Write phrases to a .jsonl or .fnsy file as they come.
+
+    Args:
+        phrases: (start_measure, syllables[, alignment]) tuples
+        path: Output file
+        aligned: The phrases come with alignments (needed up front by the
+            binary format)
+
+    Returns:
+        Number of phrases written
+    """
+    if export_format(path) == 'jsonl':
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            return write_jsonl(phrases, f)
+    with open(path, 'wb') as f:
+        return write_binary(phrases, f, aligned)
@@ -5,62 +5,468 @@ Fonetizer: Convert song lyrics to singing-phonetic tables
 Usage:
     python fonetizer.py input.txt
     cat lyrics.txt | python fonetizer.py
+    cat huge.txt | python fonetizer.py --stream > syllables.tsv
+    python fonetizer.py --profile input.txt output.xlsx
+    python fonetizer.py --pronunciation-policy stressed --pronunciations my_words.txt input.txt
 """
 
 import sys
 import re
 import os
-from typing import List, Tuple
-import cmudict
-import eng_to_ipa as ipa_converter
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side
-
-# Load CMU Pronouncing Dictionary
-CMU_DICT = cmudict.dict()
-
-# ARPABET to IPA mapping (with stress-based vowel length)
-ARPABET_TO_IPA = {
-    # Vowels - primary stress (1) = long vowels
-    'AA': 'ɑ',    'AA0': 'ɑ',    'AA1': 'ɑː',   'AA2': 'ɑ',
-    'AE': 'æ',    'AE0': 'æ',    'AE1': 'æ',    'AE2': 'æ',
-    'AH': 'ʌ',    'AH0': 'ə',    'AH1': 'ʌ',    'AH2': 'ʌ',
-    'AO': 'ɔ',    'AO0': 'ɔ',    'AO1': 'ɔː',   'AO2': 'ɔ',
-    'AW': 'aʊ',   'AW0': 'aʊ',   'AW1': 'aʊ',   'AW2': 'aʊ',
-    'AY': 'aɪ',   'AY0': 'aɪ',   'AY1': 'aɪ',   'AY2': 'aɪ',
-    'EH': 'ɛ',    'EH0': 'ɛ',    'EH1': 'ɛ',    'EH2': 'ɛ',
-    'ER': 'ɜːr',  'ER0': 'ər',   'ER1': 'ɝː',   'ER2': 'ɜːr',
-    'EY': 'eɪ',   'EY0': 'eɪ',   'EY1': 'eɪ',   'EY2': 'eɪ',
-    'IH': 'ɪ',    'IH0': 'ɪ',    'IH1': 'ɪ',    'IH2': 'ɪ',
-    'IY': 'i',    'IY0': 'i',    'IY1': 'iː',   'IY2': 'i',
-    'OW': 'oʊ',   'OW0': 'oʊ',   'OW1': 'oʊ',   'OW2': 'oʊ',
-    'OY': 'ɔɪ',   'OY0': 'ɔɪ',   'OY1': 'ɔɪ',   'OY2': 'ɔɪ',
-    'UH': 'ʊ',    'UH0': 'ʊ',    'UH1': 'ʊ',    'UH2': 'ʊ',
-    'UW': 'u',    'UW0': 'u',    'UW1': 'uː',   'UW2': 'u',
-
-    # Consonants
-    'B': 'b',   'CH': 'ʧ',  'D': 'd',   'DH': 'ð',
-    'F': 'f',   'G': 'g',   'HH': 'h',  'JH': 'ʤ',
-    'K': 'k',   'L': 'l',   'M': 'm',   'N': 'n',
-    'NG': 'ŋ',  'P': 'p',   'R': 'r',   'S': 's',
-    'SH': 'ʃ',  'T': 't',   'TH': 'θ',  'V': 'v',
-    'W': 'w',   'Y': 'j',   'Z': 'z',   'ZH': 'ʒ',
-}
+import io
+import atexit
+import argparse
+import stat
+import time
+import threading
+import contextvars
+from collections import Counter, OrderedDict, deque, namedtuple
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, wraps
+from itertools import accumulate
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple, Union
+from lexicon import load_lexicon
+from pronunciations import DEFAULT_POLICY, POLICIES, VariantIndex, index_from_environment, load_overrides
+from syllable_table import SyllableTable
+
+# Defined here before the lexicon moved to lexicon.py; re-exported so that
+# fonetizer.ARPABET_TO_IPA and fonetizer.arpabet_to_ipa keep working
+from lexicon import ARPABET_TO_IPA, arpabet_to_ipa  # noqa: F401
+
+# Heavy resources are loaded on first use so that `import fonetizer` stays cheap:
+# the compiled lexicon in get_lexicon(), eng_to_ipa in the OOV fallback and
+# openpyxl in build_excel_table().
+_lexicon = None
+_variant_index = None
+
+
+def get_lexicon():
+    """Return the compiled CMU lexicon, loading it on first call"""
+    global _lexicon
+    if _lexicon is None:
+        with _stage('lexicon_load'):
+            _lexicon = load_lexicon()
+    return _lexicon
+
+
+def get_variant_index() -> VariantIndex:
+    """
+    Return the pronunciation variant index, building it on first call from
+    $FONETIZER_PRONUNCIATION_POLICY and $FONETIZER_PRONUNCIATIONS
+    """
+    global _variant_index
+    if _variant_index is None:
+        _variant_index = index_from_environment(get_lexicon())
+    return _variant_index
 
 
-def arpabet_to_ipa(arpabet_list: List[str]) -> str:
-    """Convert ARPABET phonemes to IPA string"""
-    ipa = ""
-    for phoneme in arpabet_list:
-        if phoneme in ARPABET_TO_IPA:
-            ipa += ARPABET_TO_IPA[phoneme]
-        else:
-            # Try without stress marker
-            base = ''.join([c for c in phoneme if not c.isdigit()])
-            if base in ARPABET_TO_IPA:
-                ipa += ARPABET_TO_IPA[base]
+def configure_pronunciations(policy: str = DEFAULT_POLICY,
+                             overrides: Union[str, Dict[str, str], None] = None) -> VariantIndex:
+    """
+    Choose how words with several pronunciations are resolved.
+
+    Rebuilds the variant index and empties the word cache, so it is meant
+    to be called once at startup, before processing.
+
+    Args:
+        policy: 'first' (CMU order), 'context' or 'stressed' (see pronunciations.py)
+        overrides: Pronunciations file path, or dict of word -> IPA
+
+    Returns:
+        The new VariantIndex
+    """
+    global _variant_index
+    if isinstance(overrides, str):
+        overrides = load_overrides(overrides, get_lexicon())
+    _variant_index = VariantIndex(get_lexicon(), policy, overrides)
+    clear_word_cache()
+    return _variant_index
+
+
+def __getattr__(name):
+    # Keep `fonetizer.LEXICON` working without loading it at import time
+    if name == 'LEXICON':
+        return get_lexicon()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'size', 'maxsize'])
+
+
+class LRUCache:
+    """
+    Bounded, approximately least-recently-used cache with hit/miss/eviction
+    counters.
+
+    Entries live in two generations. A hit in the current one is a plain
+    dict lookup, with no lock and no reordering. Once the current
+    generation holds more than maxsize / 2 entries they are appended to
+    the old one. An old entry that is hit again moves back to the current
+    generation. When the cache is full, old entries are evicted, oldest
+    first. So an entry used within the last maxsize / 2 insertions is never
+    evicted.
+
+    get() and put() are safe to call from several threads. Only misses and
+    put() take the lock. Hits are counted without it, so under heavy
+    concurrent use the hit counter may be a little low.
+
+    A maxsize of 0 disables caching (every lookup is a miss).
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = {}
+        self._old = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        value = self._data.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        with self._lock:
+            value = self._old.pop(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            self._make_room()
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+            self._old.pop(key, None)
+            self._data[key] = value
+            self._make_room()
+
+    def _make_room(self):
+        # Called with the lock held
+        if len(self._data) > self.maxsize // 2:
+            self._old.update(self._data)
+            self._data = {}
+        while self._old and len(self._data) + len(self._old) > max(self.maxsize, 0):
+            self._old.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, maxsize: int):
+        """Change the capacity, evicting least recently used entries if needed"""
+        with self._lock:
+            self.maxsize = maxsize
+            self._make_room()
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._data = {}
+            self._old.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             len(self._data) + len(self._old), self.maxsize)
+
+    def __contains__(self, key) -> bool:
+        # Membership test only: does not count as a hit or refresh recency
+        with self._lock:
+            return key in self._data or key in self._old
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data) + len(self._old)
+
+
+_MISSING = object()
+
+
+# Memoized normalized word -> IPA resolutions (lyrics are very repetitive).
+# Size can be set with FONETIZER_WORD_CACHE_SIZE or set_word_cache_size()
+DEFAULT_WORD_CACHE_SIZE = int(os.environ.get('FONETIZER_WORD_CACHE_SIZE', 20000))
+WORD_CACHE = LRUCache(DEFAULT_WORD_CACHE_SIZE)
+
+
+def set_word_cache_size(maxsize: int):
+    """Resize the word -> IPA cache (0 disables it)"""
+    WORD_CACHE.resize(maxsize)
+
+
+def clear_word_cache():
+    """Empty the word -> IPA cache and reset its statistics"""
+    WORD_CACHE.clear()
+
+
+def word_cache_info() -> CacheInfo:
+    """Return (hits, misses, evictions, size, maxsize) of the word -> IPA cache"""
+    return WORD_CACHE.info()
+
+
+# eng_to_ipa results for out-of-vocabulary words, kept across documents
+DEFAULT_OOV_CACHE_SIZE = int(os.environ.get('FONETIZER_OOV_CACHE_SIZE', 50000))
+OOV_CACHE = LRUCache(DEFAULT_OOV_CACHE_SIZE)
+
+# Max words per eng_to_ipa query (its SQL lookup uses one bind variable per word)
+OOV_BATCH_SIZE = 500
+
+# Optional on-disk OOV cache shared across runs and processes (see oov_cache.py).
+# Enabled by FONETIZER_OOV_DB or set_persistent_oov_cache()
+_persistent_oov_cache = None
+_persistent_oov_cache_checked = False
+
+
+def set_persistent_oov_cache(path: Optional[str]):
+    """Use the SQLite OOV cache at path, or disable it with None"""
+    global _persistent_oov_cache, _persistent_oov_cache_checked
+    if _persistent_oov_cache is not None:
+        _persistent_oov_cache.close()
+    if path:
+        from oov_cache import PersistentOOVCache
+        _persistent_oov_cache = PersistentOOVCache(path)
+    else:
+        _persistent_oov_cache = None
+    _persistent_oov_cache_checked = True
+
+
+def get_persistent_oov_cache():
+    """Return the persistent OOV cache, or None if it is not enabled"""
+    if not _persistent_oov_cache_checked:
+        set_persistent_oov_cache(os.environ.get('FONETIZER_OOV_DB'))
+    return _persistent_oov_cache
+
+
+# Grapheme-to-phoneme model for lexicon misses (see g2p.py), loaded on the
+# first miss. Predictions at least this confident are used as they are;
+# below it eng_to_ipa is asked first (FONETIZER_G2P_THRESHOLD)
+G2P_THRESHOLD = float(os.environ.get('FONETIZER_G2P_THRESHOLD', 0.6))
+_g2p_model = None
+_g2p_model_checked = False
+
+# word -> (IPA, confidence) of the G2P model: a word is checked against the
+# threshold by prefetch and resolve_word, and may be needed again below it
+G2P_CACHE = LRUCache(DEFAULT_OOV_CACHE_SIZE)
+
+
+def set_g2p_model(path: Optional[str]):
+    """Use the G2P model file at path, or disable prediction with None"""
+    global _g2p_model, _g2p_model_checked
+    if path:
+        from g2p import G2PModel
+        _g2p_model = G2PModel.load(path)
+    else:
+        _g2p_model = None
+    _g2p_model_checked = True
+    G2P_CACHE.clear()
+
+
+def get_g2p_model():
+    """Return the G2P model ($FONETIZER_G2P_MODEL or the shipped one), or None if there is none"""
+    global _g2p_model, _g2p_model_checked
+    if not _g2p_model_checked:
+        from g2p import load_model
+        _g2p_model = load_model()
+        _g2p_model_checked = True
+    return _g2p_model
+
+
+def predict_oov_word(word_clean: str, threshold: Optional[float] = None) -> Optional[str]:
+    """
+    G2P prediction for a word missing from the lexicon.
+
+    Args:
+        threshold: Minimum confidence (default: G2P_THRESHOLD)
+
+    Returns:
+        IPA, or None if there is no model or the prediction is less confident
+    """
+    prediction = G2P_CACHE.get(word_clean)
+    if prediction is None:
+        model = get_g2p_model()
+        if model is None:
+            return None
+        prediction = model.predict_ipa(word_clean)
+        G2P_CACHE.put(word_clean, prediction)
+    ipa, confidence = prediction
+    if not ipa or confidence < (G2P_THRESHOLD if threshold is None else threshold):
+        return None
     return ipa
 
+
+class Profiler:
+    """
+    Opt-in per-stage timers and pipeline counters.
+
+    Stages (wall time, each second counted in one stage only: time spent in
+    a nested stage is taken out of the enclosing one, so the stage times add
+    up to at most the wall time):
+        lexicon_load       opening (or building) the compiled lexicon
+        prefetch           batch resolution of a document's OOV words,
+                           without their eng_to_ipa calls
+        oov_convert        eng_to_ipa calls (from prefetch or word_lookup)
+        word_lookup        words -> phrase IPA, without the above
+        syllabify          phrase IPA -> syllables
+        build_table        CSV table
+        build_excel_table  Excel workbook
+
+    Counters, per word occurrence:
+        phrases, words     phrases and words processed
+        syllables          syllables emitted
+    per word resolved, i.e. per word cache miss (a word served from the
+    cache is not counted again; cmu_hits + oov_fallbacks = word_cache_misses):
+        word_cache_misses  words looked up past the word cache
+        cmu_hits           found in the lexicon (CMU, singing overrides,
+                           user pronunciations, contractions of known words)
+        oov_fallbacks      not found in the lexicon
+        g2p_predictions    oov_fallbacks answered by the G2P model
+    per eng_to_ipa call (prefetch converts a document's words in advance):
+        oov_converted      words sent to eng_to_ipa
+        oov_echoes         eng_to_ipa had nothing: the G2P guess or, as a
+                           last resort, the word itself is used
+
+    Hooks are called as hook(kind, name, value) as events happen, kind being
+    "stage" (value in seconds) or "count" (value = increment).
+    """
+
+    STAGES = ['lexicon_load', 'prefetch', 'oov_convert', 'word_lookup', 'syllabify',
+              'build_table', 'build_excel_table']
+    COUNTERS = ['phrases', 'words', 'word_cache_misses', 'cmu_hits', 'oov_fallbacks',
+                'g2p_predictions', 'oov_converted', 'oov_echoes', 'syllables']
+
+    def __init__(self, hooks: Iterable = ()):
+        self.seconds = Counter()
+        self.calls = Counter()
+        self.counters = Counter()
+        self.hooks = list(hooks)
+        # Time spent in nested stages, one entry per open stage
+        self._nested_seconds = []
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def add_time(self, name: str, seconds: float):
+        self.seconds[name] += seconds
+        self.calls[name] += 1
+        for hook in self.hooks:
+            hook('stage', name, seconds)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+        for hook in self.hooks:
+            hook('count', name, n)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage, excluding the stages nested in it"""
+        nested_seconds = self._nested_seconds
+        nested_seconds.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            nested = nested_seconds.pop()
+            if nested_seconds:
+                nested_seconds[-1] += seconds
+            self.add_time(name, seconds - nested)
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+        self.counters.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """Plain-dict copy of the measurements (e.g. for JSON logging)"""
+        return {
+            'stages': {name: {'seconds': self.seconds[name], 'calls': self.calls[name]}
+                       for name in self._ordered(self.seconds, self.STAGES)},
+            'counters': {name: self.counters[name] for name in self._ordered(self.counters, self.COUNTERS)},
+        }
+
+    def summary(self) -> str:
+        """Human-readable report of stage times and counters"""
+        lines = ["Stage                 time (ms)   calls"]
+        for name in self._ordered(self.seconds, self.STAGES):
+            lines.append(f"  {name:<18}{self.seconds[name] * 1000:10.1f}{self.calls[name]:8d}")
+        lines.append("Counter                   value")
+        for name in self._ordered(self.counters, self.COUNTERS):
+            lines.append(f"  {name:<18}{self.counters[name]:12d}")
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _ordered(measured, known):
+        return [name for name in known if name in measured] + sorted(set(measured) - set(known))
+
+
+# The active profiler of the current thread / async task, None when disabled
+# (the default). Instrumented code only pays for this lookup when disabled
+_active_profiler = contextvars.ContextVar('fonetizer_profiler', default=None)
+
+
+def enable_profiling(profiler: Optional[Profiler] = None) -> Profiler:
+    """Start collecting metrics in the current thread (a new Profiler if none given)"""
+    profiler = profiler or Profiler()
+    _active_profiler.set(profiler)
+    return profiler
+
+
+def disable_profiling():
+    _active_profiler.set(None)
+
+
+def get_profiler() -> Optional[Profiler]:
+    """Return the active profiler, or None if profiling is disabled"""
+    return _active_profiler.get()
+
+
+@contextmanager
+def profiling(profiler: Optional[Profiler] = None):
+    """
+    Collect metrics for the duration of a with block.
+
+    Usage:
+        with profiling() as profiler:
+            phrases = process_lines(lines)
+        print(profiler.summary())
+    """
+    profiler = profiler or Profiler()
+    token = _active_profiler.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active_profiler.reset(token)
+
+
+def _stage(name: str):
+    """Timer context for a stage, a no-op when profiling is disabled"""
+    profiler = _active_profiler.get()
+    return profiler.stage(name) if profiler is not None else nullcontext()
+
+
+def _count(name: str, n: int = 1):
+    profiler = _active_profiler.get()
+    if profiler is not None:
+        profiler.count(name, n)
+
+
+def _timed(name: str):
+    """Decorator timing every call of a function as a stage"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active_profiler.get()
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
 # Diphthongs that need to be split: [long vowel] + [glide]
 DIPHTHONGS = {
     "aɪ": ("aː", "ɪ"),  # cry, I, my, night
@@ -79,6 +485,48 @@ VOWELS = set("aeiouæɒɔəɜʌɪʊɛɑɝː")
 # IPA consonants (expanded for CMU/eng_to_ipa output)
 CONSONANTS = set("bcdfghjklmnpqrstvwxyzðθʃʒŋʧʤ")
 
+# Character classes for the single-pass syllabifier. The length mark is also
+# in VOWELS: after a vowel it lengthens it, on its own it counts as a vowel.
+CHAR_OTHER, CHAR_CONSONANT, CHAR_VOWEL, CHAR_LENGTH = range(4)
+CHAR_CLASSES = {c: CHAR_VOWEL for c in VOWELS}
+CHAR_CLASSES.update({c: CHAR_CONSONANT for c in CONSONANTS})
+CHAR_CLASSES["ː"] = CHAR_LENGTH
+
+
+# Input line: optional start measure, whitespace, phrase text
+INPUT_LINE_RE = re.compile(r'(\d+)\s+(.+)')
+
+# Pasted lyrics use typographic punctuation: map it to ASCII before
+# tokenizing. Curly quotes become straight ones (so "don’t" finds "don't"),
+# dashes between words become spaces and an ellipsis becomes "..."
+PUNCTUATION_TABLE = str.maketrans({
+    '\u2018': "'", '\u2019': "'", '\u201a': "'", '\u201b': "'", '\u2032': "'",
+    '\u00b4': "'", '`': "'",
+    '\u201c': '"', '\u201d': '"', '\u201e': '"', '\u2033': '"', '\u00ab': '"', '\u00bb': '"',
+    '\u2010': '-', '\u2011': '-',
+    '\u2012': ' ', '\u2013': ' ', '\u2014': ' ', '\u2015': ' ', '\u2212': ' ',
+    '\u2026': '...',
+    '\u00a0': ' ', '\u2009': ' ', '\u202f': ' ',
+})
+
+# A word: letters/digits, optionally joined by apostrophes or single hyphens
+# (don't, rock'n'roll, well-known), with a leading or trailing apostrophe
+# kept for elisions like 'cause and lovin'. Everything else separates words
+TOKEN_RE = re.compile(r"'?[^\W_]+(?:['-][^\W_]+)*'?")
+
+# Punctuation that makes a phrase end (keeps its final consonants), and
+# closing quotes/brackets that may follow it
+PHRASE_FINAL_PUNCTUATION = ('.', '!', '?', ',')
+CLOSING_PUNCTUATION = '"\')]'
+
+# Clitics appended to a known word (heart's, love'll, we'd): IPA to add
+CLITIC_IPA = {'ll': 'l', 've': 'v', 'd': 'd', 're': 'r', 'm': 'm'}
+
+# Possessive/contracted 's: ɪz after sibilants, s after other voiceless
+# consonants, z otherwise
+SIBILANTS = set("szʃʒʧʤ")
+VOICELESS = set("ptkfθ")
+
 
 def parse_input_line(line: str) -> Tuple[str, str]:
     """
@@ -89,53 +537,335 @@ def parse_input_line(line: str) -> Tuple[str, str]:
     Returns:
         (start_measure, text) - start_measure is empty string if not provided
     """
-    match = re.match(r'(\d+)\s+(.+)', line.strip())
+    line = line.strip()
+    match = INPUT_LINE_RE.match(line)
     if match:
         return match.group(1), match.group(2)
 
     # No measure number - just return the text with empty measure
-    return "", line.strip()
+    return "", line
 
 
-def text_to_ipa(word: str) -> str:
+@lru_cache(maxsize=DEFAULT_WORD_CACHE_SIZE)
+def normalize_word(word: str) -> str:
+    """Lowercase a word and strip surrounding punctuation (memoized: text_to_ipa calls it per token)"""
+    return word.translate(PUNCTUATION_TABLE).lower().strip(".,!?;:'\"")
+
+
+def tokenize_phrase(text: str) -> Tuple[List[str], bool]:
     """
-    Convert an English word to IPA notation.
+    Normalize and split a phrase into lexicon lookup keys in one pass.
 
-    Priority:
-    1. Manual singing-specific overrides
-    2. CMU Pronouncing Dictionary (134k words, accurate)
-    3. eng_to_ipa library (fallback for words not in CMU)
+    Typographic punctuation is mapped to ASCII and the text lowercased, then
+    TOKEN_RE picks out the words. The rare words with a hyphen or an edge
+    apostrophe are matched against the lexicon (see _lookup_keys).
+
+    Returns:
+        (words, is_phrase_final)
     """
-    word_clean = word.lower().strip(".,!?;:'\"")
+    return _tokenize(text, None)
 
-    if not word_clean:
-        return ""
 
-    # Manual overrides for singing pronunciation
-    SINGING_OVERRIDES = {
-        "used": "uːzd",  # Remove initial j for singing (juːzd → uːzd)
-        "to": "tuː",     # Always long u: for singing
-    }
+def tokenize_phrase_spans(text: str) -> Tuple[List[str], List[Tuple[int, int]], bool]:
+    """
+    tokenize_phrase(), also giving where each word is in text.
 
-    if word_clean in SINGING_OVERRIDES:
-        return SINGING_OVERRIDES[word_clean]
+    Returns:
+        (words, spans, is_phrase_final), spans[i] being the (start, end)
+        character offsets in text of the token words[i] came from (the
+        parts of a split hyphenated word share the whole word's span)
+    """
+    spans = []
+    words, is_phrase_final = _tokenize(text, spans)
+    return words, spans, is_phrase_final
+
+
+def _tokenize(text: str, spans: Optional[List[Tuple[int, int]]]) -> Tuple[List[str], bool]:
+    normalized = text.translate(PUNCTUATION_TABLE)
+    is_phrase_final = normalized.strip().rstrip(CLOSING_PUNCTUATION).endswith(PHRASE_FINAL_PUNCTUATION)
+    lowered = normalized.lower()
+
+    words = []
+    if spans is None:
+        for token in TOKEN_RE.findall(lowered):
+            if "-" in token or token[0] == "'" or token[-1] == "'":
+                words.extend(_lookup_keys(token, get_variant_index()))
+            else:
+                words.append(token)
+        return words, is_phrase_final
+
+    # An ellipsis becomes three characters and a few letters lowercase to
+    # two: then map offsets in lowered back to text
+    origin = None
+    if len(lowered) != len(text):
+        origin = [i for i, c in enumerate(text) for _ in c.translate(PUNCTUATION_TABLE).lower()]
+
+    for match in TOKEN_RE.finditer(lowered):
+        token = match.group()
+        if "-" in token or token[0] == "'" or token[-1] == "'":
+            keys = _lookup_keys(token, get_variant_index())
+        else:
+            keys = [token]
+        start, end = match.span()
+        if origin is not None:
+            start, end = origin[start], origin[end - 1] + 1
+        words.extend(keys)
+        spans.extend([(start, end)] * len(keys))
+    return words, is_phrase_final
+
+
+def _lookup_keys(token: str, lexicon) -> List[str]:
+    """
+    Lookup keys for a hyphenated word or one with an edge apostrophe.
+
+    A hyphenated word is kept whole if the lexicon has it (x-ray),
+    otherwise its parts are looked up separately. Apostrophes: a leading
+    one is kept for the lexicon's elisions ('cause, 'em), a trailing one
+    only if the word without it is unknown (lovin' -> lovin', but
+    singers' -> singers). By default the apostrophes are dropped.
+    """
+    if "-" in token:
+        if token in lexicon:
+            return [token]
+        return [key for part in token.split("-") if part for key in _lookup_keys(part, lexicon)]
 
-    # Try CMU dictionary
-    if word_clean in CMU_DICT:
-        # Take first pronunciation (most common)
-        arpabet = CMU_DICT[word_clean][0]
-        ipa = arpabet_to_ipa(arpabet)
+    stripped = token.strip("'")
+    if not stripped:
+        return []
+    if token[0] == "'" and token in lexicon:
+        return [token]
+    if stripped in lexicon or token not in lexicon:
+        return [stripped]
+    return [token]
+
+
+def resolve_word(word_clean: str) -> str:
+    """
+    Look up the IPA of a normalized word, bypassing the word cache.
+
+    Priority:
+    1. User pronunciations file (see configure_pronunciations)
+    2. Manual singing-specific overrides
+    3. CMU Pronouncing Dictionary (134k words, accurate)
+    4. G2P model trained on CMU, if confident enough (see g2p.py)
+    5. eng_to_ipa library (fallback for words not in CMU)
+
+    2 and 3 are both looked up in the compiled lexicon (see lexicon.py);
+    the variant index picks among a word's CMU pronunciations.
+    """
+    ipa = get_variant_index().get(word_clean)
+    if ipa is None and "'" in word_clean:
+        ipa = resolve_contraction(word_clean)
+    if ipa is not None:
+        _count('cmu_hits')
         return ipa
 
-    # Fallback to eng_to_ipa
+    _count('oov_fallbacks')
+    ipa = predict_oov_word(word_clean)
+    if ipa is not None:
+        _count('g2p_predictions')
+        return ipa
+
+    # Fallback to eng_to_ipa (possibly already resolved by a batch pass
+    # or by an earlier run, via the persistent cache)
+    ipa = OOV_CACHE.get(word_clean)
+    if ipa is None:
+        persistent = get_persistent_oov_cache()
+        if persistent is not None:
+            ipa = persistent.get(word_clean)
+        if ipa is None:
+            ipa = convert_oov_word(word_clean)
+            if persistent is not None:
+                persistent.put(word_clean, ipa)
+        OOV_CACHE.put(word_clean, ipa)
+    return ipa
+
+
+def resolve_contraction(word_clean: str) -> Optional[str]:
+    """
+    IPA of a known word plus a clitic missing from the lexicon as a whole
+    (heart's, love'll, song'd), or None.
+    """
+    base, _, clitic = word_clean.rpartition("'")
+    if not base or (clitic != 's' and clitic not in CLITIC_IPA):
+        return None
+    base_ipa = get_variant_index().get(base)
+    if not base_ipa:
+        return None
+    if clitic != 's':
+        return base_ipa + CLITIC_IPA[clitic]
+    last = base_ipa[-1]
+    if last in SIBILANTS:
+        return base_ipa + 'ɪz'
+    return base_ipa + ('s' if last in VOICELESS else 'z')
+
+
+@_timed('oov_convert')
+def convert_oov_word(word_clean: str) -> str:
+    """Convert a single out-of-vocabulary word with eng_to_ipa"""
+    import eng_to_ipa as ipa_converter
+    _count('oov_converted')
     try:
         ipa = ipa_converter.convert(word_clean)
-        # Remove asterisks that indicate uncertain pronunciations
-        ipa = ipa.replace("*", "")
-        return ipa
     except Exception:
-        # Last resort: return the word itself
-        return word_clean
+        return untranscribed_word(word_clean)
+    if "*" in ipa:
+        # eng_to_ipa marks words it could not transcribe (echoed back)
+        return untranscribed_word(word_clean)
+    return ipa
+
+
+def untranscribed_word(word_clean: str) -> str:
+    """
+    Pronunciation of a word eng_to_ipa could not transcribe: the G2P guess
+    however unsure (anything beats spelling), or as a last resort the word itself
+    """
+    _count('oov_echoes')
+    guess = predict_oov_word(word_clean, threshold=0.0)
+    return word_clean if guess is None else guess
+
+
+@_timed('oov_convert')
+def convert_oov_batch(words: List[str]) -> Dict[str, str]:
+    """
+    Convert many out-of-vocabulary words with as few eng_to_ipa calls as possible.
+
+    eng_to_ipa transcribes each token independently, so one query per chunk of
+    OOV_BATCH_SIZE words gives the same result as one convert() per word while
+    opening its database and running its lookup only once per chunk.
+
+    Args:
+        words: Normalized words (duplicates are resolved once)
+
+    Returns:
+        Dict of word -> IPA
+    """
+    import eng_to_ipa as ipa_converter
+
+    unique = list(dict.fromkeys(words))
+    results = {}
+    for i in range(0, len(unique), OOV_BATCH_SIZE):
+        chunk = unique[i:i + OOV_BATCH_SIZE]
+        try:
+            transcriptions = ipa_converter.ipa_list(chunk)
+        except Exception:
+            # Let the per-word path isolate the word that fails
+            for word in chunk:
+                results[word] = convert_oov_word(word)
+            continue
+
+        _count('oov_converted', len(chunk))
+        for word, candidates in zip(chunk, transcriptions):
+            # Same choice as eng_to_ipa.convert(): the last candidate
+            if "*" in candidates[-1]:
+                results[word] = untranscribed_word(word)
+            else:
+                results[word] = candidates[-1]
+
+    return results
+
+
+def prefetch_phrases(texts: Iterable[str]) -> int:
+    """
+    Resolve the out-of-vocabulary words of a whole document in one batch.
+
+    Collects every word that is neither cached nor in the lexicon, converts
+    them together with convert_oov_batch() and stores the results in
+    OOV_CACHE, so the per-phrase pass that follows never calls eng_to_ipa
+    one word at a time. Words found in the persistent OOV cache (if
+    enabled) skip the conversion, and new results are written back to it.
+
+    Returns:
+        Number of words sent to the fallback converter
+    """
+    return prefetch_words(word for text in texts for word in tokenize_phrase(text)[0])
+
+
+@_timed('prefetch')
+def prefetch_words(words: Iterable[str]) -> int:
+    """
+    prefetch_phrases() for already normalized words.
+
+    Returns:
+        Number of words sent to the fallback converter
+    """
+    index = get_variant_index()
+    seen = set()
+    pending = []
+    for word_clean in words:
+        if not word_clean or word_clean in seen:
+            continue
+        seen.add(word_clean)
+        if word_clean in WORD_CACHE or word_clean in OOV_CACHE or word_clean in index:
+            continue
+        if "'" in word_clean and resolve_contraction(word_clean) is not None:
+            continue
+        if predict_oov_word(word_clean) is not None:
+            continue
+        pending.append(word_clean)
+
+    if not pending:
+        return 0
+
+    resolved = {}
+    persistent = get_persistent_oov_cache()
+    if persistent is not None:
+        resolved = persistent.get_many(pending)
+        pending = [word for word in pending if word not in resolved]
+
+    if pending:
+        converted = convert_oov_batch(pending)
+        if persistent is not None:
+            persistent.put_many(converted)
+        resolved.update(converted)
+
+    for word, ipa in resolved.items():
+        OOV_CACHE.put(word, ipa)
+
+    return len(pending)
+
+
+def text_to_ipa(word: str) -> str:
+    """
+    Convert an English word to IPA notation.
+
+    Results are memoized per normalized word in WORD_CACHE; see
+    resolve_word() for the lookup order.
+    """
+    word_clean = normalize_word(word)
+
+    if not word_clean:
+        return ""
+
+    return cached_resolve_word(word_clean)
+
+
+def cached_resolve_word(word_clean: str) -> str:
+    """resolve_word() through WORD_CACHE, for an already normalized, non-empty word"""
+    ipa = WORD_CACHE.get(word_clean)
+    if ipa is None:
+        _count('word_cache_misses')
+        ipa = resolve_word(word_clean)
+        WORD_CACHE.put(word_clean, ipa)
+    return ipa
+
+
+def join_word_ipas(words: List[str], ipas: List[str]) -> str:
+    """
+    Concatenate a phrase's word IPAs, applying the variant index's context
+    rules (e.g. "the" before a vowel) to the words they cover.
+
+    Args:
+        words: Normalized words of the phrase
+        ipas: IPA of each word out of context (modified in place)
+    """
+    rules = get_variant_index().context_rules
+    if rules:
+        for i in range(len(words) - 1):
+            rule = rules.get(words[i])
+            if rule is not None:
+                ipas[i] = rule[0] if ipas[i + 1][:1] in VOWELS else rule[1]
+    return ''.join(ipas)
 
 
 def find_vowel_positions(ipa: str) -> List[Tuple[int, int, str]]:
@@ -177,9 +907,10 @@ def syllabify_phrase_ipa(phrase_ipa: str, is_phrase_final: bool) -> List[Tuple[s
     """
     Syllabify a complete phrase IPA string.
 
-    Algorithm:
-    1. Find all vowels in the phrase
-    2. For each vowel, assign consonants:
+    Algorithm (single pass, driven by CHAR_CLASSES):
+    1. Collect consonants until the next vowel
+    2. At each vowel (plus a diphthong partner and/or length mark), emit a
+       syllable with the consonants collected since the previous vowel:
        - Consonants BEFORE vowel = this syllable's initial consonants
        - Consonants AFTER vowel = next syllable's initial consonants
        - Exception: phrase-final consonants get their own syllable with empty vowel
@@ -188,56 +919,88 @@ def syllabify_phrase_ipa(phrase_ipa: str, is_phrase_final: bool) -> List[Tuple[s
     Returns:
         List of (consonant, vowel) tuples
     """
-    if not phrase_ipa:
-        return []
+    return _syllabify(phrase_ipa, is_phrase_final, None)[0]
 
-    # Find all vowel positions
-    vowel_positions = find_vowel_positions(phrase_ipa)
 
-    if not vowel_positions:
-        return []
+def syllabify_phrase_ipa_aligned(phrase_ipa: str, is_phrase_final: bool,
+                                 word_ends: Sequence[int]) -> Tuple[List[Tuple[str, str]], List[Tuple[int, int]]]:
+    """
+    syllabify_phrase_ipa(), also telling which words each syllable comes from.
 
-    syllables = []
+    Args:
+        phrase_ipa: Concatenated IPA of the phrase's words
+        is_phrase_final: As for syllabify_phrase_ipa
+        word_ends: End offset of each word's IPA in phrase_ipa
 
-    # Process each vowel
-    for vowel_idx, (vowel_start, vowel_end, vowel) in enumerate(vowel_positions):
-        # Determine where consonants for this syllable start
-        if vowel_idx == 0:
-            cons_start = 0
-        else:
-            # Start after previous vowel
-            _, prev_vowel_end, _ = vowel_positions[vowel_idx - 1]
-            cons_start = prev_vowel_end
-
-        # Collect consonants before this vowel
-        consonants = ""
-        for i in range(cons_start, vowel_start):
-            if phrase_ipa[i] in CONSONANTS:
-                consonants += phrase_ipa[i]
-
-        # Handle diphthongs
-        if vowel in DIPHTHONGS:
-            long_v, glide = DIPHTHONGS[vowel]
-            syllables.append((consonants, long_v))
-            syllables.append(("", glide))
-        else:
-            syllables.append((consonants, vowel))
+    Returns:
+        (syllables, words), words[k] being the (first, last) index of the
+        words syllable k is made of: its consonants may come from the words
+        before its vowel's. Both rows of a split diphthong get the vowel's word
+    """
+    return _syllabify(phrase_ipa, is_phrase_final, word_ends)
 
-    # Handle phrase-final consonants
-    if is_phrase_final and vowel_positions:
-        _, last_vowel_end, _ = vowel_positions[-1]
 
-        # Collect any remaining consonants
-        final_consonants = ""
-        for i in range(last_vowel_end, len(phrase_ipa)):
-            if phrase_ipa[i] in CONSONANTS:
-                final_consonants += phrase_ipa[i]
+def _syllabify(phrase_ipa: str, is_phrase_final: bool, word_ends: Optional[Sequence[int]]):
+    classes = CHAR_CLASSES
+    diphthongs = DIPHTHONGS
+    syllables = []
+    consonants = ""
+    n = len(phrase_ipa)
+    i = 0
 
-        # Add as separate syllable with empty vowel
-        if final_consonants:
-            syllables.append((final_consonants, ""))
+    # Alignment: word index per syllable, found by walking word_ends along
+    # with i (positions only ever increase)
+    aligned = word_ends is not None
+    words = [] if aligned else None
+    word = 0
+    last_word = len(word_ends) - 1 if aligned else 0
+    first = 0       # word of the first pending consonant
+
+    while i < n:
+        char = phrase_ipa[i]
+        char_class = classes.get(char, CHAR_OTHER)
+        i += 1
+
+        if char_class == CHAR_CONSONANT:
+            if aligned:
+                while word < last_word and i > word_ends[word]:
+                    word += 1
+                if not consonants:
+                    first = word
+            consonants += char
+        elif char_class != CHAR_OTHER:
+            # Vowel (or stray length mark): check for diphthong, then length mark
+            vowel = char
+            pair = phrase_ipa[i - 1:i + 1]
+            if aligned:
+                while word < last_word and i > word_ends[word]:
+                    word += 1
+            if pair in diphthongs:
+                vowel = pair
+                i += 1
+            if i < n and phrase_ipa[i] == "ː":
+                vowel += "ː"
+                i += 1
 
-    return syllables
+            split = diphthongs.get(vowel)
+            if split:
+                syllables.append((consonants, split[0]))
+                syllables.append(("", split[1]))
+            else:
+                syllables.append((consonants, vowel))
+            if aligned:
+                words.append((first if consonants else word, word))
+                if split:
+                    words.append((word, word))
+            consonants = ""
+
+    # Phrase-final consonants: separate syllable with empty vowel
+    if is_phrase_final and syllables and consonants:
+        syllables.append((consonants, ""))
+        if aligned:
+            words.append((first, word))
+
+    return syllables, words
 
 
 def move_medial_consonants(syllables: List[Tuple[str, str]], is_phrase_final: bool) -> List[Tuple[str, str]]:
@@ -284,23 +1047,70 @@ def text_to_phonetic_syllables(text: str) -> List[Tuple[str, str]]:
     Returns:
         List of (consonant, vowel) tuples
     """
-    # Check if phrase-final
-    text_clean = text.strip()
-    is_phrase_final = text_clean.endswith(('.', '!', '?', ','))
-    words = text_clean.split()
+    profiler = _active_profiler.get()
+    if profiler is not None:
+        t0 = time.perf_counter()
+
+    # Normalized words, and whether the phrase is final
+    words, is_phrase_final = tokenize_phrase(text)
 
     # Convert all words to IPA and concatenate into single phrase IPA
-    phrase_ipa = ""
-    for word in words:
-        word_ipa = text_to_ipa(word)
-        phrase_ipa += word_ipa
+    phrase_ipa = join_word_ipas(words, [cached_resolve_word(word) for word in words])
+
+    if profiler is not None:
+        t1 = time.perf_counter()
 
     # Syllabify the complete phrase
     syllables = syllabify_phrase_ipa(phrase_ipa, is_phrase_final)
 
+    if profiler is not None:
+        profiler.add_time('word_lookup', t1 - t0)
+        profiler.add_time('syllabify', time.perf_counter() - t1)
+        profiler.count('phrases')
+        profiler.count('words', len(words))
+        profiler.count('syllables', len(syllables))
+
     return syllables
 
 
+class WordAlignment(NamedTuple):
+    """
+    Which words of a phrase each of its syllables comes from.
+
+    spans holds the (start, end) offsets in text of every word, syllables
+    the (first, last) word index of every syllable, in the order of the
+    phrase's syllable list (split diphthongs and phrase-final consonants
+    included).
+    """
+    text: str
+    spans: List[Tuple[int, int]]
+    syllables: List[Tuple[int, int]]
+
+    def syllable_text(self, index: int) -> str:
+        """The part of text that syllable index was made from (whole words)"""
+        first, last = self.syllables[index]
+        return self.text[self.spans[first][0]:self.spans[last][1]]
+
+
+def align_phrase(text: str) -> Tuple[List[Tuple[str, str]], WordAlignment]:
+    """
+    Syllabify a phrase like process_phrase(), keeping track of the words.
+
+    The word boundaries are recorded while the word IPAs are concatenated
+    and followed through the syllabification pass, so this costs about as
+    much as process_phrase().
+
+    Returns:
+        (syllables, alignment)
+    """
+    words, spans, is_phrase_final = tokenize_phrase_spans(text)
+    ipas = [cached_resolve_word(word) for word in words]
+    phrase_ipa = join_word_ipas(words, ipas)
+    syllables, syllable_words = syllabify_phrase_ipa_aligned(phrase_ipa, is_phrase_final,
+                                                             list(accumulate(map(len, ipas))))
+    return syllables, WordAlignment(text, spans, syllable_words)
+
+
 def process_phrase(text: str) -> List[Tuple[str, str]]:
     """
     Process a complete phrase into phonetic syllables.
@@ -311,183 +1121,486 @@ def process_phrase(text: str) -> List[Tuple[str, str]]:
     return text_to_phonetic_syllables(text)
 
 
-def build_table(phrases: List[Tuple[str, List[Tuple[str, str]]]]) -> str:
+# Phrases tokenized and resolved together by process_phrases()
+PHRASE_BATCH_SIZE = 1000
+
+
+def process_phrases(texts: Iterable[str], batch_size: int = PHRASE_BATCH_SIZE,
+                    align: bool = False) -> Iterator[List[Tuple[str, str]]]:
+    """
+    Process many phrases, lazily, sharing the word work between them.
+
+    Phrases are taken batch_size at a time. Each batch is tokenized and
+    normalized once, its unique words are resolved once each (unknown words
+    in a single eng_to_ipa batch, see prefetch_words), and then every phrase
+    is syllabified. Gives the same syllables as process_phrase() per text.
+
+    Args:
+        texts: Phrase texts, e.g. a generator over a file
+        batch_size: Phrases per batch (bounds memory and output latency)
+        align: Also give each phrase's WordAlignment, as align_phrase() does
+
+    Yields:
+        List of (consonant, vowel) tuples per phrase, in input order
+        ((syllables, alignment) pairs if align)
+    """
+    batch = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) >= batch_size:
+            yield from _process_phrase_batch(batch, align)
+            batch = []
+    if batch:
+        yield from _process_phrase_batch(batch, align)
+
+
+def _process_phrase_batch(texts: List[str], align: bool = False) -> list:
+    profiler = _active_profiler.get()
+
+    with _stage('word_lookup'):
+        # Tokenize and normalize every phrase once
+        tokenized = []
+        spans = []
+        unique_words = {}
+        for text in texts:
+            if align:
+                words, word_spans, is_phrase_final = tokenize_phrase_spans(text)
+                spans.append(word_spans)
+            else:
+                words, is_phrase_final = tokenize_phrase(text)
+            tokenized.append((words, is_phrase_final))
+            unique_words.update(dict.fromkeys(words))
+
+        # Resolve each unique word once
+        prefetch_words(unique_words)
+        ipa_of = {word: cached_resolve_word(word) for word in unique_words}
+        phrase_ipas = []
+        for words, is_phrase_final in tokenized:
+            ipas = [ipa_of[word] for word in words]
+            phrase_ipa = join_word_ipas(words, ipas)
+            # Where each word's IPA ends in phrase_ipa, for the alignment
+            word_ends = list(accumulate(map(len, ipas))) if align else None
+            phrase_ipas.append((phrase_ipa, is_phrase_final, word_ends))
+
+    with _stage('syllabify'):
+        if align:
+            results = []
+            for text, word_spans, (phrase_ipa, is_phrase_final, word_ends) in zip(texts, spans, phrase_ipas):
+                syllables, syllable_words = syllabify_phrase_ipa_aligned(phrase_ipa, is_phrase_final, word_ends)
+                results.append((syllables, WordAlignment(text, word_spans, syllable_words)))
+        else:
+            results = [syllabify_phrase_ipa(phrase_ipa, is_phrase_final)
+                       for phrase_ipa, is_phrase_final, _ in phrase_ipas]
+
+    if profiler is not None:
+        profiler.count('phrases', len(texts))
+        profiler.count('words', sum(len(words) for words, _ in tokenized))
+        profiler.count('syllables', sum(len(result[0] if align else result) for result in results))
+    return results
+
+
+@_timed('build_table')
+def build_table(phrases: Union[SyllableTable, List[Tuple[str, List[Tuple[str, str]]]]]) -> str:
     """
     Build the transposed table with column pairs for each phrase.
 
     Args:
-        phrases: List of (start_measure, syllables)
+        phrases: SyllableTable, or list of (start_measure, syllables)
 
     Returns:
         CSV formatted string
     """
-    # Find maximum number of syllables (rows needed)
-    max_syllables = max(len(syllables) for _, syllables in phrases)
+    table = SyllableTable.from_phrases(phrases)
+    if not len(table):
+        raise ValueError("No phrases to build a table from")
 
     # Build header row
     header = ["Syllable"]
-    for start, _ in phrases:
+    for start in table.starts:
         header.extend([f"T{start}", ""])  # Only start measure on left column
 
-    # Build data rows
+    # Build data rows, one per syllable of the longest phrase (empty
+    # consonant and vowel where a phrase is shorter)
     rows = [header]
 
-    for syllable_idx in range(max_syllables):
-        row = [str(syllable_idx + 1)]
-
-        for _, syllables in phrases:
-            if syllable_idx < len(syllables):
-                consonant, vowel = syllables[syllable_idx]
-                row.append(consonant)
-                row.append(vowel)
-            else:
-                row.append("")  # Empty consonant
-                row.append("")  # Empty vowel
-
-        rows.append(row)
+    for syllable_idx, cells in enumerate(table.transposed_rows()):
+        rows.append([str(syllable_idx + 1)] + cells)
 
     # Convert to CSV
     return '\n'.join('\t'.join(row) for row in rows)
 
 
-def build_excel_table(phrases: List[Tuple[str, List[Tuple[str, str]]]], output_path: str):
+def _excel_named_styles():
+    """
+    The fixed set of cell styles used by build_excel_table.
+
+    Returns:
+        Dict of style name -> NamedStyle. Names are "<part>" or "<part>-last"
+        (bottom row of the table), part being header-first, header-consonant,
+        header-vowel, first, consonant or vowel.
+    """
+    from openpyxl.styles import Font, Alignment, Border, Side, NamedStyle
+
+    # Border styles
+    thin_border = Side(style='thin', color='000000')
+    thick_border = Side(style='medium', color='000000')
+
+    center = Alignment(horizontal='center', vertical='center')
+    right = Alignment(horizontal='right', vertical='center')
+    left = Alignment(horizontal='left', vertical='center')
+    bold = Font(bold=True)
+
+    styles = {
+        # Header row: bold, centered, thick top and bottom
+        'header-first': NamedStyle(font=bold, alignment=center, border=Border(
+            top=thick_border, bottom=thick_border, left=thick_border, right=thin_border)),
+        'header-consonant': NamedStyle(font=bold, alignment=center, border=Border(
+            top=thick_border, bottom=thick_border, left=thick_border, right=thin_border)),
+        'header-vowel': NamedStyle(font=bold, alignment=center, border=Border(
+            top=thick_border, bottom=thick_border, left=thin_border, right=thick_border)),
+    }
+    for suffix, bottom in (('', thin_border), ('-last', thick_border)):
+        # Syllable number column
+        styles['first' + suffix] = NamedStyle(alignment=center, border=Border(
+            top=thin_border, bottom=bottom, left=thick_border, right=thin_border))
+        # Consonants: right-aligned, thick border on the left of the pair
+        styles['consonant' + suffix] = NamedStyle(alignment=right, border=Border(
+            top=thin_border, bottom=bottom, left=thick_border, right=thin_border))
+        # Vowels: left-aligned, bold, thick border on the right of the pair
+        styles['vowel' + suffix] = NamedStyle(font=bold, alignment=left, border=Border(
+            top=thin_border, bottom=bottom, left=thin_border, right=thick_border))
+
+    for name, style in styles.items():
+        style.name = f"Fonetizer {name}"
+    return styles
+
+
+# Excel sheets have at most 16,384 columns: "Syllable" plus two per phrase
+EXCEL_MAX_PHRASES = (16384 - 1) // 2
+
+# Phrases per sheet; longer tables are split over several sheets, each still
+# quick to write and to open (FONETIZER_EXCEL_SHEET_PHRASES)
+EXCEL_SHEET_PHRASES = int(os.environ.get('FONETIZER_EXCEL_SHEET_PHRASES', 1000))
+
+# If set, a new sheet also starts every this many measures: T1-T32,
+# T33-T64, ... (FONETIZER_EXCEL_SHEET_MEASURES, 0 = by phrase count only)
+EXCEL_SHEET_MEASURES = int(os.environ.get('FONETIZER_EXCEL_SHEET_MEASURES', 0))
+
+# Title of the only sheet of a table that is not split
+EXCEL_SHEET_TITLE = "Phonetic Table"
+
+
+def excel_sheets(starts: Sequence[str], sheet_phrases: Optional[int] = None,
+                 sheet_measures: Optional[int] = None) -> List[Tuple[str, int, int]]:
+    """
+    Split a table's phrases into sheets.
+
+    Args:
+        starts: Start measure per phrase
+        sheet_phrases: Most phrases per sheet (default: EXCEL_SHEET_PHRASES,
+            never more than EXCEL_MAX_PHRASES)
+        sheet_measures: Measures per sheet, 0 for none (default:
+            EXCEL_SHEET_MEASURES). A phrase without a measure number goes
+            on the sheet of the phrase before it
+
+    Returns:
+        (title, begin, end) per sheet, covering phrases[begin:end]
+    """
+    sheet_phrases = EXCEL_SHEET_PHRASES if sheet_phrases is None else sheet_phrases
+    sheet_measures = EXCEL_SHEET_MEASURES if sheet_measures is None else sheet_measures
+    if sheet_phrases < 1:
+        raise ValueError(f"Phrases per sheet must be at least 1, got {sheet_phrases}")
+    if sheet_measures < 0:
+        raise ValueError(f"Measures per sheet must be 0 or more, got {sheet_measures}")
+    sheet_phrases = min(sheet_phrases, EXCEL_MAX_PHRASES)
+
+    # [begin, measure range] per sheet
+    breaks = [[0, None]]
+    for i, start in enumerate(starts):
+        current = breaks[-1][1]
+        measure_range = current
+        if sheet_measures and start:
+            block = (int(start) - 1) // sheet_measures
+            measure_range = (block * sheet_measures + 1, (block + 1) * sheet_measures)
+        if i - breaks[-1][0] >= sheet_phrases or (current is not None and measure_range != current):
+            breaks.append([i, measure_range])
+        else:
+            breaks[-1][1] = measure_range
+
+    if len(breaks) == 1:
+        return [(EXCEL_SHEET_TITLE, 0, len(starts))]
+
+    sheets = []
+    seen = Counter()
+    for (begin, measure_range), (end, _) in zip(breaks, breaks[1:] + [[len(starts), None]]):
+        if measure_range is not None:
+            title = f"T{measure_range[0]}-T{measure_range[1]}"
+        elif end - begin > 1:
+            title = f"Phrases {begin + 1}-{end}"
+        else:
+            title = f"Phrase {end}"
+        seen[title] += 1
+        if seen[title] > 1:
+            title += f" ({seen[title]})"
+        sheets.append((title, begin, end))
+    return sheets
+
+
+@_timed('build_excel_table')
+def build_excel_table(phrases: Union[SyllableTable, List[Tuple[str, List[Tuple[str, str]]]]],
+                      output_path: Union[str, BinaryIO, None] = None,
+                      sheet_phrases: Optional[int] = None,
+                      sheet_measures: Optional[int] = None) -> Optional[bytes]:
     """
     Build a formatted Excel table with column pairs for each phrase.
 
     Args:
-        phrases: List of (start_measure, syllables)
-        output_path: Path to save the Excel file
+        phrases: SyllableTable, or list of (start_measure, syllables)
+        output_path: Path or writable binary stream (e.g. io.BytesIO) to save
+            the Excel file to. If None, nothing is written to disk
+        sheet_phrases: Most phrases per sheet (default: EXCEL_SHEET_PHRASES)
+        sheet_measures: Start a new sheet every this many measures, 0 for
+            never (default: EXCEL_SHEET_MEASURES)
+
+    Returns:
+        The .xlsx file contents if output_path is None, otherwise None
 
     Formatting:
         - Consonant columns: right-aligned
         - Vowel columns: left-aligned, bold
         - Borders around each column pair
+
+    Sheets are written with openpyxl's write-only (streaming) worksheets:
+    rows go straight to the file, every cell refers to one of a few shared
+    named styles, and column widths are worked out from the phrase data
+    before the first row is written. A table longer than one sheet (see
+    excel_sheets) is written sheet after sheet, so only one sheet's rows
+    are built at a time.
     """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    table = SyllableTable.from_phrases(phrases)
+    sheets = excel_sheets(table.starts, sheet_phrases, sheet_measures)
+
     # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Phonetic Table"
+    wb = Workbook(write_only=True)
+
+    styles = _excel_named_styles()
+    for style in styles.values():
+        wb.add_named_style(style)
+    names = {key: style.name for key, style in styles.items()}
+
+    for title, begin, end in sheets:
+        ws = wb.create_sheet(title)
+
+        # Find maximum number of syllables (rows needed)
+        max_syllables = table.max_syllables(begin, end)
+
+        # Build header row
+        header = ["Syllable"]
+        for start in table.starts[begin:end]:
+            header.extend([f"T{start}", ""])  # Only start measure on left column
+
+        # Column widths: longest value per column (+2, minimum 8). In write-only
+        # mode they must be set before the first row, so take them from the data
+        widths = [max(len(header[0]), len(str(max_syllables)))]
+        for start, (consonant_width, vowel_width) in zip(table.starts[begin:end],
+                                                         table.column_widths(begin, end)):
+            widths.append(max(len(f"T{start}"), consonant_width))
+            widths.append(vowel_width)
+        for col_idx, width in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = max(width + 2, 8)  # Minimum width of 8
+
+        def styled(value, style_name):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style_name
+            return cell
+
+        ws.append([styled(header[0], names['header-first'])] + [
+            styled(value, names['header-consonant'] if idx % 2 == 0 else names['header-vowel'])
+            for idx, value in enumerate(header[1:])
+        ])
+
+        # Build data rows
+        for syllable_idx, cells in enumerate(table.transposed_rows(begin, end)):
+            suffix = '-last' if syllable_idx == max_syllables - 1 else ''
+            consonant_style = names['consonant' + suffix]
+            vowel_style = names['vowel' + suffix]
+
+            row = [styled(str(syllable_idx + 1), names['first' + suffix])]
+            for consonant, vowel in zip(cells[::2], cells[1::2]):  # "" where a phrase is shorter
+                row.append(styled(consonant, consonant_style))
+                row.append(styled(vowel, vowel_style))
+
+            ws.append(row)
 
-    # Find maximum number of syllables (rows needed)
-    max_syllables = max(len(syllables) for _, syllables in phrases) if phrases else 0
+    # Save workbook
+    if output_path is None:
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        return buffer.getvalue()
+    wb.save(output_path)
+    return None
 
-    # Border styles
-    thin_border = Side(style='thin', color='000000')
-    thick_border = Side(style='medium', color='000000')
 
-    # Build header row
-    header = ["Syllable"]
-    for start, _ in phrases:
-        header.extend([f"T{start}", ""])  # Only start measure on left column
+# Column headers of the long (row-per-syllable) stream format
+STREAM_HEADER = ["Phrase", "Measure", "Syllable", "Consonant", "Vowel"]
+
+# Extra column of the stream format with --align: the words of the syllable
+STREAM_ALIGN_HEADER = ["Words"]
+
+# Phrases per process_phrases() batch in write_syllable_stream, for input
+# read from a file (see stream_batch_size)
+STREAM_BATCH_SIZE = 100
+
+# Output extensions written by exports.py (exports.EXPORT_FORMATS), which is
+# only imported when one is used
+EXPORT_EXTENSIONS = ('.jsonl', '.fnsy')
+
+
+def iter_input_phrases(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Parse input lines lazily, skipping blank lines.
+
+    Yields:
+        (start_measure, text) per phrase
+    """
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield parse_input_line(line)
+
 
-    ws.append(header)
-
-    # Format header row
-    for col_idx, cell in enumerate(ws[1], start=1):
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-
-        # Add top and bottom borders
-        if col_idx == 1:
-            # First column (Syllable)
-            cell.border = Border(
-                top=thick_border,
-                bottom=thick_border,
-                left=thick_border,
-                right=thin_border
-            )
+def process_lines(lines: Iterable[str]) -> SyllableTable:
+    """
+    Parse and syllabify a whole document.
+
+    Words are resolved once per unique word and all out-of-vocabulary words
+    in one batch before any phrase is syllabified (see process_phrases).
+
+    Returns:
+        SyllableTable (reads like a list of (start_measure, syllables)),
+        ready for build_table/build_excel_table
+    """
+    parsed = list(iter_input_phrases(lines))
+    texts = [text for _, text in parsed]
+    table = SyllableTable()
+    for (start, _), syllables in zip(parsed, process_phrases(texts, batch_size=max(len(texts), 1))):
+        table.append(start, syllables)
+    return table
+
+
+def write_table(phrases: Union[SyllableTable, List[Tuple[str, List[Tuple[str, str]]]]], output_path: str,
+                sheet_phrases: Optional[int] = None, sheet_measures: Optional[int] = None):
+    """
+    Write phrases as formatted Excel (.xlsx, split into sheets as in
+    build_excel_table), as a JSON Lines or binary export (.jsonl, .fnsy, see
+    exports.py) or as CSV (any other extension)
+    """
+    if output_path.endswith('.xlsx'):
+        build_excel_table(phrases, output_path, sheet_phrases, sheet_measures)
+    elif output_path.endswith(EXPORT_EXTENSIONS):
+        from exports import write_export
+        write_export(phrases, output_path)
+    else:
+        table = build_table(phrases)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(table)
+
+
+def convert_file(input_path: str, output_path: str) -> int:
+    """
+    Convert one lyrics file to a table file.
+
+    Returns:
+        Number of phrases converted
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        phrases = process_lines(f)
+    write_table(phrases, output_path)
+    return len(phrases)
+
+
+def stream_batch_size(infile) -> int:
+    """
+    Batch size for streaming from infile: STREAM_BATCH_SIZE for a regular
+    file, which can be read ahead without waiting, and 1 for a pipe or
+    terminal, so each phrase is written as soon as its line arrives
+    """
+    try:
+        mode = os.fstat(infile.fileno()).st_mode
+    except (AttributeError, OSError, ValueError):
+        return 1
+    return STREAM_BATCH_SIZE if stat.S_ISREG(mode) else 1
+
+
+def write_syllable_stream(phrases: Iterable[Tuple[str, str]], out: TextIO, align: bool = False,
+                          batch_size: int = STREAM_BATCH_SIZE) -> int:
+    """
+    Syllabify phrases in small batches and write them in long format.
+
+    One tab-separated row per syllable: phrase id, measure, syllable index,
+    consonant, vowel. Phrases go through process_phrases() batch_size at a
+    time and each batch is written (and flushed) as soon as it is
+    syllabified, so memory use does not grow with the input. With a
+    batch_size of 1 every phrase is written before the next one is read.
+
+    Args:
+        phrases: Iterable of (start_measure, text), e.g. iter_input_phrases(f)
+        out: Text stream to write to
+        align: Add a column with the lyric words each syllable comes from
+        batch_size: Phrases per batch (see stream_batch_size)
+
+    Returns:
+        Number of phrases written
+    """
+    out.write('\t'.join(STREAM_HEADER + (STREAM_ALIGN_HEADER if align else [])) + '\n')
+
+    phrase_id = 0
+    for phrase_id, phrase in enumerate(iter_syllabified(phrases, batch_size, align), start=1):
+        start, syllables = phrase[0], phrase[1]
+        if align:
+            alignment = phrase[2]
+            out.write(''.join(
+                f"{phrase_id}\t{start}\t{idx}\t{consonant}\t{vowel}\t{alignment.syllable_text(idx - 1)}\n"
+                for idx, (consonant, vowel) in enumerate(syllables, start=1)
+            ))
         else:
-            # Phrase columns - add thick border between pairs
-            phrase_idx = (col_idx - 2) // 2
-            is_first_in_pair = (col_idx - 2) % 2 == 0
-            is_last_in_pair = (col_idx - 2) % 2 == 1
-            is_last_column = col_idx == len(header)
-
-            left = thick_border if is_first_in_pair else thin_border
-            right = thick_border if (is_last_in_pair or is_last_column) else thin_border
-
-            cell.border = Border(
-                top=thick_border,
-                bottom=thick_border,
-                left=left,
-                right=right
-            )
-
-    # Build data rows
-    for syllable_idx in range(max_syllables):
-        row_data = [str(syllable_idx + 1)]
-
-        for _, syllables in phrases:
-            if syllable_idx < len(syllables):
-                consonant, vowel = syllables[syllable_idx]
-                row_data.append(consonant)
-                row_data.append(vowel)
-            else:
-                row_data.append("")  # Empty consonant
-                row_data.append("")  # Empty vowel
-
-        ws.append(row_data)
-
-        # Format data row
-        row_num = syllable_idx + 2  # +2 because header is row 1, and we're 0-indexed
-        for col_idx, cell in enumerate(ws[row_num], start=1):
-            is_last_row = syllable_idx == max_syllables - 1
-
-            if col_idx == 1:
-                # Syllable number column
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                bottom = thick_border if is_last_row else thin_border
-                cell.border = Border(
-                    top=thin_border,
-                    bottom=bottom,
-                    left=thick_border,
-                    right=thin_border
-                )
-            else:
-                # Phrase columns
-                phrase_idx = (col_idx - 2) // 2
-                is_consonant = (col_idx - 2) % 2 == 0
-                is_vowel = (col_idx - 2) % 2 == 1
-                is_first_in_pair = is_consonant
-                is_last_in_pair = is_vowel
-                is_last_column = col_idx == len(row_data)
-
-                # Alignment
-                if is_consonant:
-                    cell.alignment = Alignment(horizontal='right', vertical='center')
-                else:  # vowel
-                    cell.alignment = Alignment(horizontal='left', vertical='center')
-                    cell.font = Font(bold=True)  # Bold vowels
-
-                # Borders
-                left = thick_border if is_first_in_pair else thin_border
-                right = thick_border if (is_last_in_pair or is_last_column) else thin_border
-                bottom = thick_border if is_last_row else thin_border
-
-                cell.border = Border(
-                    top=thin_border,
-                    bottom=bottom,
-                    left=left,
-                    right=right
-                )
-
-    # Auto-adjust column widths
-    for col_idx, column in enumerate(ws.columns, start=1):
-        max_length = 0
-        column_letter = ws.cell(row=1, column=col_idx).column_letter
-
-        for cell in column:
-            try:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            except:
-                pass
-
-        adjusted_width = max(max_length + 2, 8)  # Minimum width of 8
-        ws.column_dimensions[column_letter].width = adjusted_width
+            out.write(''.join(
+                f"{phrase_id}\t{start}\t{idx}\t{consonant}\t{vowel}\n"
+                for idx, (consonant, vowel) in enumerate(syllables, start=1)
+            ))
+        if phrase_id % batch_size == 0:
+            out.flush()
 
-    # Save workbook
-    wb.save(output_path)
+    return phrase_id
+
+
+def iter_syllabified(phrases: Iterable[Tuple[str, str]], batch_size: int = STREAM_BATCH_SIZE,
+                     align: bool = False) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+    """
+    Syllabify (start_measure, text) pairs lazily, batch_size at a time.
+
+    Yields:
+        (start_measure, syllables) per phrase, in input order, or
+        (start_measure, syllables, WordAlignment) if align
+    """
+    # Measures of the phrases read ahead by process_phrases
+    starts = deque()
+
+    def texts():
+        for start, text in phrases:
+            starts.append(start)
+            yield text
+
+    if align:
+        for syllables, alignment in process_phrases(texts(), batch_size, align=True):
+            yield starts.popleft(), syllables, alignment
+        return
+    for syllables in process_phrases(texts(), batch_size):
+        yield starts.popleft(), syllables
 
 
 def main():
@@ -499,46 +1612,128 @@ def main():
         python fonetizer.py input.txt output.csv         # CSV to file
         python fonetizer.py input.txt output.xlsx        # Excel with formatting
         python fonetizer.py input.txt > output.csv       # CSV via redirection
+        python fonetizer.py --stream input.txt out.tsv   # Row per syllable, streamed
+        python fonetizer.py input.txt output.jsonl       # Phrase per line as JSON, streamed
+        python fonetizer.py input.txt output.fnsy        # Compact indexed binary, streamed
+        python fonetizer.py --align input.txt out.jsonl  # With the words of every syllable
+        python fonetizer.py --profile input.txt out.xlsx # Print stage times and counters
+        python fonetizer.py --sheet-measures 32 input.txt out.xlsx  # A sheet per 32 measures
+        python fonetizer.py --pronunciations words.txt input.txt  # Own pronunciations
     """
+    parser = argparse.ArgumentParser(description="Convert song lyrics to singing-phonetic tables")
+    parser.add_argument('input', nargs='?', help="Lyrics file, one phrase per line (default: stdin)")
+    parser.add_argument('output', nargs='?',
+                        help="Output file: .xlsx for formatted Excel, .jsonl for JSON Lines, .fnsy for "
+                             "the binary export, otherwise CSV (default: stdout)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write one row per syllable (phrase, measure, syllable, consonant, vowel) "
+                             "as each phrase is processed, in constant memory")
+    parser.add_argument('--align', action='store_true',
+                        help="Record which lyric words each syllable comes from "
+                             "(--stream, .jsonl and .fnsy outputs)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print per-stage times and counters to stderr when done")
+    parser.add_argument('--pronunciation-policy', choices=POLICIES,
+                        help="How to choose among a word's pronunciations: first (CMU order, default), "
+                             "context (plus rules like 'the' before a vowel) or stressed "
+                             "(prefer unreduced vowels, plus the context rules)")
+    parser.add_argument('--pronunciations', metavar='FILE',
+                        help="File of 'word pronunciation' lines overriding the dictionary "
+                             "(IPA, or a CMU variant number)")
+    parser.add_argument('--sheet-phrases', type=int, metavar='N',
+                        help="Excel: split the table into sheets of at most N phrases "
+                             f"(default: {EXCEL_SHEET_PHRASES})")
+    parser.add_argument('--sheet-measures', type=int, metavar='N',
+                        help="Excel: start a new sheet every N measures (T1-TN, ...)")
+    args = parser.parse_args()
+
+    if ((args.sheet_phrases is not None or args.sheet_measures is not None)
+            and not (args.output and args.output.endswith('.xlsx'))):
+        parser.error("--sheet-phrases and --sheet-measures only apply to .xlsx output")
+
+    if args.align and not (args.stream or (args.output and args.output.endswith(EXPORT_EXTENSIONS))):
+        parser.error("--align only applies to --stream and to .jsonl and .fnsy outputs")
+
+    if args.profile:
+        profiler = enable_profiling()
+        atexit.register(lambda: print(profiler.summary(), file=sys.stderr))
+
+    if args.pronunciation_policy or args.pronunciations:
+        try:
+            configure_pronunciations(
+                args.pronunciation_policy or os.environ.get('FONETIZER_PRONUNCIATION_POLICY') or DEFAULT_POLICY,
+                args.pronunciations or os.environ.get('FONETIZER_PRONUNCIATIONS'))
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    if args.stream:
+        if args.output and args.output.endswith('.xlsx'):
+            parser.error("--stream writes tab-separated text, not .xlsx")
+        if args.output and args.output.endswith(EXPORT_EXTENSIONS):
+            parser.error("--stream writes tab-separated text; .jsonl and .fnsy outputs are streamed without it")
+
+        infile = open(args.input, 'r', encoding='utf-8') if args.input else sys.stdin
+        if args.output:
+            outfile = open(args.output, 'w', encoding='utf-8')
+        else:
+            outfile = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        try:
+            count = write_syllable_stream(iter_input_phrases(infile), outfile, args.align,
+                                          stream_batch_size(infile))
+            outfile.flush()
+        except BrokenPipeError:
+            # Reader went away (e.g. `| head`): stop quietly
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            sys.exit(1)
+        finally:
+            if args.input:
+                infile.close()
+            if args.output:
+                outfile.close()
+        if args.output:
+            print(f"Stream file created: {args.output} ({count} phrases)", file=sys.stderr)
+        return
+
+    if args.output and args.output.endswith(EXPORT_EXTENSIONS):
+        # One record per phrase: written as the phrases are processed
+        from exports import write_export
+        infile = open(args.input, 'r', encoding='utf-8') if args.input else sys.stdin
+        try:
+            count = write_export(iter_syllabified(iter_input_phrases(infile), stream_batch_size(infile),
+                                                  args.align),
+                                 args.output, args.align)
+        finally:
+            if args.input:
+                infile.close()
+        print(f"Export file created: {args.output} ({count} phrases)", file=sys.stderr)
+        return
+
     # Read input
-    if len(sys.argv) > 1:
-        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+    if args.input:
+        with open(args.input, 'r', encoding='utf-8') as f:
             lines = f.readlines()
     else:
         lines = sys.stdin.readlines()
 
-    # Parse all phrases
-    phrases = []
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+    try:
+        phrases = process_lines(lines)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
+    # Determine output format
+    if args.output:
+        # Output filename specified as second argument
         try:
-            start, text = parse_input_line(line)
-            syllables = process_phrase(text)
-            phrases.append((start, syllables))
+            write_table(phrases, args.output, args.sheet_phrases, args.sheet_measures)
         except ValueError as e:
             print(f"Error: {e}", file=sys.stderr)
             sys.exit(1)
-
-    # Determine output format
-    if len(sys.argv) > 2:
-        # Output filename specified as second argument
-        output_file = sys.argv[2]
-        if output_file.endswith('.xlsx'):
-            # Generate formatted Excel file
-            build_excel_table(phrases, output_file)
-            print(f"Excel file created: {output_file}", file=sys.stderr)
-        else:
-            # Generate CSV file
-            table = build_table(phrases)
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(table)
-            print(f"CSV file created: {output_file}", file=sys.stderr)
+        kind = "Excel" if args.output.endswith('.xlsx') else "CSV"
+        print(f"{kind} file created: {args.output}", file=sys.stderr)
     else:
         # Output to stdout (CSV format)
-        import io
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
         table = build_table(phrases)
         print(table)
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Grapheme-to-phoneme predictor for words missing from the lexicon
+
+A letter-context model trained offline from the CMU dictionary itself and
+shipped as a small data file (g2p_model.tsv.gz), so out-of-vocabulary
+words ("gonna", "rockin", names) get a dictionary-style pronunciation in
+microseconds, with a confidence score, instead of going to eng_to_ipa.
+
+Training:
+    1. Align every CMU word letter by letter with its phonemes: each letter
+       produces zero, one or two phonemes ("x" -> K S). Alignments are found
+       with a few rounds of hard EM (Viterbi alignment, then re-estimating
+       letter -> phoneme chunk probabilities), starting from co-occurrence
+       counts along the diagonal.
+    2. For every letter, count the phoneme chunk it produced in growing
+       windows of surrounding letters ("^" and "$" mark the word edges),
+       narrowest first: "a", "a" + 1 right, 1 left + "a" + 1 right, ...
+    3. Keep a window only if it predicts something else than the next
+       narrower one, or the same with clearly more confidence (pruning).
+       Windows whose prediction never failed are not widened further.
+
+Prediction takes, for each letter, the widest window in the model. The
+letter's confidence is the share of training occurrences of that window
+that agreed with the prediction, smoothed by one (a window seen once
+scores 0.5); the word's confidence is its least confident letter's. On
+held-out CMU words about 80% of predictions at confidence 0.6 or more
+are right (ignoring stress).
+
+Model file (gzip, UTF-8, tab-separated):
+    #g2p    format version, cmudict version
+    window  chunk (space-separated ARPABET, empty for silent)  confidence
+
+The model file is only read to compile it, once, into a memory-mapped
+table in the lexicon's file format (g2p_model.g2p next to it, rebuilt when
+the model file changes; see lexicon.py). Loading the model is then a matter
+of opening that file, and all worker processes share its pages, instead of
+each one parsing 150 000 lines into a dict (0.3 s and 30 MB per process).
+
+Usage:
+    python g2p.py                    # train and write the default model
+    python g2p.py --evaluate         # also report accuracy on held-out CMU words
+    python g2p.py --predict gonna rockin
+"""
+
+import sys
+import os
+import io
+import gzip
+import math
+import random
+import hashlib
+import argparse
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MODEL_FORMAT = 1
+
+# Default location of the trained model (override with FONETIZER_G2P_MODEL)
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'g2p_model.tsv.gz')
+
+# (left, right) letters of context, narrowest first; right context comes
+# first because English spelling is mostly decided by what follows (silent e)
+WINDOWS = [(0, 0), (0, 1), (1, 1), (1, 2), (2, 2), (2, 3), (3, 3), (3, 4), (4, 4)]
+
+# Windows seen fewer times than this are not kept (1: keep all; the
+# smoothed confidence already discounts rare windows)
+MIN_COUNT = 1
+
+# A window predicting the same as the next narrower one is kept only if it
+# is this much more confident
+MIN_CONFIDENCE_GAIN = 0.05
+
+# Hard-EM rounds for the letter/phoneme alignment
+ALIGN_ITERATIONS = 4
+
+# Word edge markers in windows
+WORD_START = '^'
+WORD_END = '$'
+
+# Alignment score of a chunk never seen with a letter
+UNSEEN_LOG_PROB = math.log(1e-6)
+
+
+def window_key(padded: str, pos: int, left: int, right: int) -> str:
+    """Key of the window around padded[pos]: left context, letter, right context"""
+    return f"{padded[max(0, pos - left):pos]}|{padded[pos]}|{padded[pos + 1:pos + 1 + right]}"
+
+
+def training_entries() -> List[Tuple[str, List[str]]]:
+    """Plain alphabetic CMU words with their first pronunciation"""
+    import cmudict
+
+    seen = set()
+    entries = []
+    for word, arpabet in cmudict.entries():
+        if word in seen or not word.isalpha() or not word.isascii():
+            continue
+        seen.add(word)
+        entries.append((word, arpabet))
+    return entries
+
+
+def _strip_stress(phoneme: str) -> str:
+    return phoneme.rstrip('012')
+
+
+def _initial_scores(entries: List[Tuple[str, List[str]]]) -> Dict[str, Dict[str, float]]:
+    """letter -> phoneme log probabilities from co-occurrence near the diagonal"""
+    counts: Dict[str, Counter] = defaultdict(Counter)
+    for word, phonemes in entries:
+        n, m = len(word), len(phonemes)
+        for i, letter in enumerate(word):
+            center = (i + 0.5) * m / n
+            for j in range(max(0, int(center) - 1), min(m, int(center) + 2)):
+                counts[letter][_strip_stress(phonemes[j])] += 1
+            counts[letter][''] += 0.5
+    return _log_probs(counts)
+
+
+def _log_probs(counts: Dict[str, Counter]) -> Dict[str, Dict[str, float]]:
+    scores = {}
+    for letter, chunks in counts.items():
+        total = sum(chunks.values())
+        scores[letter] = {chunk: math.log(count / total) for chunk, count in chunks.items()}
+    return scores
+
+
+def align(word: str, phonemes: List[str], scores: Dict[str, Dict[str, float]]) -> Optional[List[str]]:
+    """
+    Best split of phonemes over the letters of word, one chunk per letter.
+
+    Returns:
+        List of len(word) chunks (space-joined phonemes, '' for silent
+        letters), or None if the word has too many phonemes to align
+    """
+    n, m = len(word), len(phonemes)
+    if m > 2 * n:
+        return None
+    bare = [_strip_stress(p) for p in phonemes]
+    neg_inf = float('-inf')
+    best = [[neg_inf] * (m + 1) for _ in range(n + 1)]
+    back = [[0] * (m + 1) for _ in range(n + 1)]
+    best[0][0] = 0.0
+    for i in range(n):
+        letter_scores = scores.get(word[i], {})
+        row = best[i]
+        next_row = best[i + 1]
+        next_back = back[i + 1]
+        for j in range(m + 1):
+            score = row[j]
+            if score == neg_inf:
+                continue
+            for size in (0, 1, 2):
+                if j + size > m:
+                    break
+                chunk = ' '.join(bare[j:j + size])
+                total = score + letter_scores.get(chunk, UNSEEN_LOG_PROB)
+                if total > next_row[j + size]:
+                    next_row[j + size] = total
+                    next_back[j + size] = size
+    if best[n][m] == neg_inf:
+        return None
+
+    chunks = []
+    j = m
+    for i in range(n, 0, -1):
+        size = back[i][j]
+        chunks.append(' '.join(phonemes[j - size:j]))
+        j -= size
+    chunks.reverse()
+    return chunks
+
+
+def align_entries(entries: List[Tuple[str, List[str]]], iterations: int = ALIGN_ITERATIONS,
+                  log=None) -> List[Tuple[str, List[str]]]:
+    """Align every entry with hard EM; entries that cannot be aligned are dropped"""
+    scores = _initial_scores(entries)
+    aligned = []
+    for iteration in range(iterations):
+        aligned = []
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        for word, phonemes in entries:
+            chunks = align(word, phonemes, scores)
+            if chunks is None:
+                continue
+            aligned.append((word, chunks))
+            for letter, chunk in zip(word, chunks):
+                counts[letter][' '.join(_strip_stress(p) for p in chunk.split())] += 1
+        scores = _log_probs(counts)
+        if log:
+            log(f"  alignment round {iteration + 1}: {len(aligned)} words aligned")
+    return aligned
+
+
+def train(aligned: List[Tuple[str, List[str]]], min_count: int = MIN_COUNT) -> Dict[str, Tuple[str, float]]:
+    """
+    Build the pruned window table from aligned words.
+
+    Windows are counted level by level, and only at positions where the
+    previous level's window was still ambiguous, so the wide windows are
+    counted for the few positions that need them.
+
+    Returns:
+        Dict of window key -> (chunk, confidence)
+    """
+    positions = []
+    for word, chunks in aligned:
+        padded = WORD_START + word + WORD_END
+        for i, chunk in enumerate(chunks):
+            positions.append((padded, i + 1, chunk))
+
+    model: Dict[str, Tuple[str, float]] = {}
+    parent_prediction = [None] * len(positions)
+    parent_confidence = [0.0] * len(positions)
+    active = list(range(len(positions)))
+    for left, right in WINDOWS:
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        keys = {}
+        for p in active:
+            padded, pos, chunk = positions[p]
+            key = window_key(padded, pos, left, right)
+            keys[p] = key
+            counts[key][chunk] += 1
+
+        predictions = {}
+        for key, chunk_counts in counts.items():
+            chunk, count = chunk_counts.most_common(1)[0]
+            total = sum(chunk_counts.values())
+            predictions[key] = (chunk, count / (total + 1), total, count == total)
+
+        still_active = []
+        for p in active:
+            key = keys[p]
+            chunk, confidence, total, unanimous = predictions[key]
+            if total < min_count:
+                continue
+            if key not in model and (chunk != parent_prediction[p] or
+                                     confidence > parent_confidence[p] + MIN_CONFIDENCE_GAIN):
+                model[key] = (chunk, confidence)
+            parent_prediction[p] = chunk
+            parent_confidence[p] = confidence
+            if not unanimous:
+                still_active.append(p)
+        active = still_active
+    return model
+
+
+def save_model(model: Dict[str, Tuple[str, float]], path: str, source: str = ''):
+    """Write a model file (gzip TSV, sorted, see the module docstring)"""
+    tmp_path = f"{path}.tmp"
+    # mtime=0: the same model always compresses to the same bytes
+    with gzip.GzipFile(tmp_path, 'wb', mtime=0) as raw, \
+            io.TextIOWrapper(raw, encoding='utf-8', newline='\n') as f:
+        f.write(f"#g2p\t{MODEL_FORMAT}\t{source}\n")
+        for key in sorted(model):
+            chunk, confidence = model[key]
+            f.write(f"{key}\t{chunk}\t{confidence:.3f}\n")
+    os.replace(tmp_path, path)
+
+
+def read_model(path: str) -> Dict[str, Tuple[str, float]]:
+    """Parse a model file into a dict of window -> (chunk, confidence)"""
+    table = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = f.readline().rstrip('\n').split('\t')
+        if header[:2] != ['#g2p', str(MODEL_FORMAT)]:
+            raise ValueError(f"Not a Fonetizer G2P model (format {MODEL_FORMAT}): {path}")
+        for line in f:
+            key, chunk, confidence = line.rstrip('\n').split('\t')
+            table[key] = (chunk, float(confidence))
+    return table
+
+
+def compiled_model_path(path: str) -> str:
+    """Where the compiled form of the model file at path is kept (g2p_model.tsv.gz -> g2p_model.g2p)"""
+    stem = path[:-3] if path.endswith('.gz') else path
+    return f"{os.path.splitext(stem)[0]}.g2p"
+
+
+def model_fingerprint(path: str) -> bytes:
+    """Fingerprint of a model file and of the compiled format"""
+    from lexicon import FORMAT_VERSION
+
+    h = hashlib.sha1(f"g2p={MODEL_FORMAT};lexicon={FORMAT_VERSION};".encode('utf-8'))
+    with open(path, 'rb') as f:
+        h.update(f.read())
+    return h.digest()
+
+
+class CompiledTable:
+    """
+    Read-only window -> (chunk, confidence) mapping backed by a compiled,
+    memory-mapped model (a lexicon file whose values are "chunk<TAB>confidence").
+    """
+
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        value = self.lexicon.get(key)
+        if value is None:
+            return None
+        chunk, confidence = value.split('\t')
+        return chunk, float(confidence)
+
+    def __len__(self) -> int:
+        return len(self.lexicon)
+
+
+class G2PModel:
+    """
+    Trained letter-context model.
+
+    predict(word) returns (arpabet phonemes, confidence); predict_ipa(word)
+    the same pronunciation as IPA, converted like the lexicon's entries.
+    """
+
+    def __init__(self, table):
+        """table: dict of window -> (chunk, confidence), or a CompiledTable"""
+        self.table = table
+
+    @classmethod
+    def load(cls, path: str) -> 'G2PModel':
+        """Open the model file at path through its compiled form, compiling it first if needed"""
+        from lexicon import open_compiled, write_lexicon
+
+        fingerprint = model_fingerprint(path)
+
+        def build(compiled_path: str) -> str:
+            entries = {key: [f"{chunk}\t{confidence!r}"] for key, (chunk, confidence) in read_model(path).items()}
+            return write_lexicon(compiled_path, entries, fingerprint)
+
+        return cls(CompiledTable(open_compiled(compiled_model_path(path), fingerprint, build)))
+
+    def predict(self, word: str) -> Tuple[List[str], float]:
+        """
+        Predict the ARPABET phonemes of a lowercase word.
+
+        Returns:
+            (phonemes, confidence); confidence is 0.0 for a word with
+            letters the model has never seen
+        """
+        table = self.table
+        padded = WORD_START + word + WORD_END
+        phonemes = []
+        confidence = 1.0
+        for pos in range(1, len(padded) - 1):
+            found = None
+            for left, right in reversed(WINDOWS):
+                found = table.get(window_key(padded, pos, left, right))
+                if found is not None:
+                    break
+            if found is None:
+                return [], 0.0
+            chunk, letter_confidence = found
+            if chunk:
+                phonemes.extend(chunk.split(' '))
+            if letter_confidence < confidence:
+                confidence = letter_confidence
+        return phonemes, confidence
+
+    def predict_ipa(self, word: str) -> Tuple[str, float]:
+        """predict() converted to IPA (letters other than a-z give confidence 0.0)"""
+        from lexicon import arpabet_to_ipa
+
+        if not word.isascii() or not word.isalpha():
+            return '', 0.0
+        phonemes, confidence = self.predict(word)
+        return arpabet_to_ipa(phonemes), confidence
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+
+def model_path(path: Optional[str] = None) -> str:
+    """The model file used: path, $FONETIZER_G2P_MODEL or DEFAULT_MODEL_PATH"""
+    return path or os.environ.get('FONETIZER_G2P_MODEL') or DEFAULT_MODEL_PATH
+
+
+def load_model(path: Optional[str] = None) -> Optional[G2PModel]:
+    """
+    Load the model from path, $FONETIZER_G2P_MODEL or DEFAULT_MODEL_PATH.
+
+    Returns:
+        The model, or None if there is no model file
+    """
+    path = model_path(path)
+    if not os.path.exists(path):
+        return None
+    return G2PModel.load(path)
+
+
+def evaluate(model: G2PModel, held_out: List[Tuple[str, List[str]]], thresholds: Iterable[float]):
+    """Print word accuracy (ignoring stress) of predictions above each confidence threshold"""
+    results = []
+    for word, phonemes in held_out:
+        predicted, confidence = model.predict(word)
+        correct = [_strip_stress(p) for p in predicted] == [_strip_stress(p) for p in phonemes]
+        results.append((confidence, correct, predicted == phonemes))
+    print(f"{'threshold':>10}{'coverage':>10}{'accuracy':>10}{'w/ stress':>10}")
+    for threshold in thresholds:
+        kept = [r for r in results if r[0] >= threshold]
+        if not kept:
+            continue
+        print(f"{threshold:10.2f}{len(kept) / len(results):10.1%}"
+              f"{sum(r[1] for r in kept) / len(kept):10.1%}{sum(r[2] for r in kept) / len(kept):10.1%}")
+
+
+def main():
+    """Train (and optionally evaluate) the model, or predict words"""
+    parser = argparse.ArgumentParser(description="Train the G2P predictor from the CMU dictionary")
+    parser.add_argument('--output', default=DEFAULT_MODEL_PATH, help="Model file to write")
+    parser.add_argument('--evaluate', action='store_true',
+                        help="Train on 95%% of the words and report accuracy on the rest first")
+    parser.add_argument('--predict', nargs='+', metavar='WORD', help="Predict words with an existing model")
+    args = parser.parse_args()
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    if args.predict:
+        model = load_model(args.output)
+        if model is None:
+            parser.error(f"no model at {args.output}, train one first")
+        for word in args.predict:
+            ipa, confidence = model.predict_ipa(word.lower())
+            print(f"{word}\t{ipa}\t{confidence:.2f}")
+        return
+
+    import cmudict
+
+    entries = training_entries()
+    log(f"{len(entries)} training words")
+
+    if args.evaluate:
+        rng = random.Random(1)
+        shuffled = entries[:]
+        rng.shuffle(shuffled)
+        cut = len(shuffled) // 20
+        held_out, train_part = shuffled[:cut], shuffled[cut:]
+        model = G2PModel(train(align_entries(train_part, log=log)))
+        log(f"Held-out evaluation on {len(held_out)} words ({len(model)} windows):")
+        evaluate(model, held_out, [0.0, 0.5, 0.6, 0.7, 0.8, 0.9])
+
+    table = train(align_entries(entries, log=log))
+    save_model(table, args.output, f"cmudict-{cmudict.__version__}")
+    size_kb = os.path.getsize(args.output) / 1024
+    log(f"Model written: {args.output} ({len(table)} windows, {size_kb:.0f} KB)")
+
+
+if __name__ == '__main__':
+    main()
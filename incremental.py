@@ -0,0 +1,286 @@
+"""
+Incremental rebuilds of lyric catalogues
+
+A manifest remembers, for every input file, the hash of its contents, the
+output written for it and a hash of the table in that output, plus the
+syllables of every phrase seen, keyed by a hash of the phrase text. A
+rebuild then:
+
+    - skips a file whose contents and output are unchanged (one stat and
+      one hash, no parsing),
+    - syllabifies only the phrases of a changed file that are not in the
+      manifest yet (all changed files' new phrases in one batch, so a word
+      shared by several songs is resolved once),
+    - rewrites an output only if its table actually differs (or the file
+      is missing or was touched by someone else).
+
+Phrase results depend on the lexicon, the pronunciation settings, the G2P
+model and eng_to_ipa; all of these go into the manifest's fingerprint, and
+a manifest with another fingerprint starts from scratch.
+
+Manifest file (JSON, written atomically):
+    version, fingerprint
+    files    input path -> {hash, output, table, size, mtime, layout, phrases}
+    phrases  phrase hash -> [[consonant, vowel], ...]
+
+Used by `batch.py --incremental` and `batch.py --watch`.
+"""
+
+import io
+import os
+import json
+import hashlib
+import tempfile
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import fonetizer
+from syllable_table import SyllableTable
+
+MANIFEST_VERSION = 1
+
+# Default manifest file name, in the output directory (or the current one)
+MANIFEST_NAME = '.fonetizer-manifest.json'
+
+
+class BuildResult(NamedTuple):
+    input_path: str
+    output_path: str
+    status: str          # 'unchanged', 'written', 'up to date' (same table) or 'failed'
+    phrases: int
+    reprocessed: int     # phrases syllabified in this run
+    error: Optional[str]
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def phrase_key(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def results_fingerprint() -> str:
+    """Hash of everything besides the text that phrase results depend on"""
+    from oov_cache import converter_version
+    from g2p import model_path
+
+    index = fonetizer.get_variant_index()
+    # The G2P model file by identity: loading it just for this would cost
+    # more than a whole no-op rebuild
+    model = _file_stamp(model_path())
+    h = hashlib.blake2b(digest_size=16)
+    h.update(fonetizer.get_lexicon().fingerprint)
+    h.update(f"{MANIFEST_VERSION};{index.policy};{sorted(index.overrides.items())!r};".encode('utf-8'))
+    h.update(f"{model};{fonetizer.G2P_THRESHOLD};{converter_version()}".encode('utf-8'))
+    return h.hexdigest()
+
+
+class Manifest:
+    """
+    Per-file content hashes and per-phrase results of earlier builds.
+
+    Load with Manifest.load(path) (an empty manifest if the file is missing,
+    unreadable or from other settings), save with save().
+    """
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.files: Dict[str, dict] = {}
+        self.phrases: Dict[str, List[Tuple[str, str]]] = {}
+
+    @classmethod
+    def load(cls, path: str, fingerprint: Optional[str] = None) -> 'Manifest':
+        fingerprint = fingerprint or results_fingerprint()
+        manifest = cls(path, fingerprint)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if data.get('version') == MANIFEST_VERSION and data.get('fingerprint') == fingerprint:
+            manifest.files = data['files']
+            manifest.phrases = {key: [tuple(syllable) for syllable in syllables]
+                                for key, syllables in data['phrases'].items()}
+        return manifest
+
+    def save(self):
+        """Write the manifest atomically, dropping phrases no file uses any more"""
+        used = {key for entry in self.files.values() for key in entry['phrases']}
+        self.phrases = {key: syllables for key, syllables in self.phrases.items() if key in used}
+        data = {
+            'version': MANIFEST_VERSION,
+            'fingerprint': self.fingerprint,
+            'files': self.files,
+            'phrases': self.phrases,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def forget_except(self, input_paths: Iterable[str]):
+        """Drop the entries of input files not in input_paths (deleted or no longer selected)"""
+        keep = set(input_paths)
+        for path in [path for path in self.files if path not in keep]:
+            del self.files[path]
+
+    def is_current(self, input_path: str, output_path: str, data: bytes) -> bool:
+        """True if input_path has these contents and its output is still the one we wrote"""
+        entry = self.files.get(input_path)
+        if entry is None or entry['hash'] != content_hash(data) or entry['output'] != output_path:
+            return False
+        if entry.get('layout', '') != _layout(output_path):
+            return False
+        return _file_stamp(output_path) == (entry['size'], entry['mtime'])
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _layout(output_path: str) -> str:
+    """Settings besides the phrases that an output depends on: the sheet split of Excel files"""
+    if output_path.endswith('.xlsx'):
+        return f"sheets {fonetizer.EXCEL_SHEET_PHRASES};{fonetizer.EXCEL_SHEET_MEASURES}"
+    return ''
+
+
+def _table_hash(parsed: List[Tuple[str, str]], keys: List[str], manifest: Manifest, output_path: str) -> str:
+    """Hash of everything an output is rendered from: measures, syllables and layout"""
+    data = {
+        'layout': _layout(output_path),
+        'phrases': [[start, manifest.phrases[key]] for (start, _), key in zip(parsed, keys)],
+    }
+    return content_hash(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _read_bytes(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _render(table: SyllableTable, output_path: str) -> bytes:
+    if output_path.endswith('.xlsx'):
+        return fonetizer.build_excel_table(table)
+    if output_path.endswith(fonetizer.EXPORT_EXTENSIONS):
+        from exports import write_binary, write_jsonl
+        if output_path.endswith('.jsonl'):
+            out = io.StringIO(newline='\n')
+            write_jsonl(table, out)
+            return out.getvalue().encode('utf-8')
+        out = io.BytesIO()
+        write_binary(table, out)
+        return out.getvalue()
+    return fonetizer.build_table(table).encode('utf-8')
+
+
+def _write_atomic(path: str, data: bytes):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def build(jobs: Iterable[Tuple[str, str]], manifest: Manifest,
+          process: Optional[Callable[[List[str]], List[List[Tuple[str, str]]]]] = None) -> List[BuildResult]:
+    """
+    Bring the outputs of (input_path, output_path) pairs up to date.
+
+    Args:
+        jobs: Files to build
+        manifest: Results of earlier builds, updated in place (not saved)
+        process: Syllabifies a list of phrase texts (default: in-process
+            fonetizer.process_phrases; batch.py passes a process pool)
+
+    Returns:
+        One BuildResult per job, in order
+    """
+    if process is None:
+        process = lambda texts: list(fonetizer.process_phrases(texts, batch_size=max(len(texts), 1)))
+
+    results: Dict[int, BuildResult] = {}
+    pending = []            # (job index, input, output, data, parsed phrases, keys)
+    missing: Dict[str, str] = {}
+    for i, (input_path, output_path) in enumerate(jobs):
+        try:
+            with open(input_path, 'rb') as f:
+                data = f.read()
+            if manifest.is_current(input_path, output_path, data):
+                phrases = len(manifest.files[input_path]['phrases'])
+                results[i] = BuildResult(input_path, output_path, 'unchanged', phrases, 0, None)
+                continue
+            parsed = list(fonetizer.iter_input_phrases(data.decode('utf-8').splitlines()))
+        except (OSError, ValueError) as e:
+            results[i] = BuildResult(input_path, output_path, 'failed', 0, 0, f"{type(e).__name__}: {e}")
+            continue
+        keys = [phrase_key(text) for _, text in parsed]
+        for key, (_, text) in zip(keys, parsed):
+            if key not in manifest.phrases:
+                missing[key] = text
+        pending.append((i, input_path, output_path, data, parsed, keys))
+
+    # New phrases of every changed file, syllabified together
+    if missing:
+        for key, syllables in zip(missing, process(list(missing.values()))):
+            manifest.phrases[key] = [tuple(syllable) for syllable in syllables]
+
+    for i, input_path, output_path, data, parsed, keys in pending:
+        try:
+            table = SyllableTable()
+            for (start, _), key in zip(parsed, keys):
+                table.append(start, manifest.phrases[key])
+            table_hash = _table_hash(parsed, keys, manifest, output_path)
+
+            entry = manifest.files.get(input_path)
+            stamp = _file_stamp(output_path)
+            if (entry is not None and entry['table'] == table_hash and entry['output'] == output_path
+                    and stamp == (entry['size'], entry['mtime'])):
+                status = 'up to date'
+            else:
+                rendered = _render(table, output_path)
+                # An Excel file embeds its creation time, so only text is compared
+                if output_path.endswith('.xlsx') or _read_bytes(output_path) != rendered:
+                    _write_atomic(output_path, rendered)
+                    stamp = _file_stamp(output_path)
+                    status = 'written'
+                else:
+                    status = 'up to date'
+
+            manifest.files[input_path] = {
+                'hash': content_hash(data), 'output': output_path, 'table': table_hash,
+                'size': stamp[0], 'mtime': stamp[1], 'layout': _layout(output_path), 'phrases': keys,
+            }
+            reprocessed = sum(key in missing for key in set(keys))
+            results[i] = BuildResult(input_path, output_path, status, len(keys), reprocessed, None)
+        except Exception as e:
+            results[i] = BuildResult(input_path, output_path, 'failed', 0, 0, f"{type(e).__name__}: {e}")
+
+    return [results[i] for i in sorted(results)]
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Compiled pronunciation lexicon for Fonetizer
+
+The CMU Pronouncing Dictionary (plus the singing overrides) is compiled once
+into a compact binary file with every pronunciation already converted to IPA.
+Lookups go through mmap and a hash table of the keys, so no process ever has
+to parse the full CMU text file, and all workers share the same pages through
+the OS page cache. The first pronunciation of every word looked up is
+decoded once per process and kept in a dict, so repeated lookups (lyrics are
+very repetitive) cost one dict probe.
+
+File layout (all integers little-endian uint32):
+    header      magic, format version, byte order check, entry count,
+                hash slot count, blob sizes and a fingerprint of the inputs
+    key_offsets count + 1 offsets into the key blob
+    val_offsets count + 1 offsets into the value blob
+    hash slots  open-addressing table of entry index + 1 (0 = empty),
+                indexed by crc32(key), so a lookup is usually one probe
+    key blob    UTF-8 words, sorted bytewise
+    value blob  UTF-8 IPA pronunciations, variants separated by VARIANT_SEP
+
+Usage:
+    python lexicon.py                 # build at the default location
+    python lexicon.py path/to/file    # build at a custom location
+"""
+
+import sys
+import os
+import mmap
+import struct
+import zlib
+import bisect
+import hashlib
+import tempfile
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# ARPABET to IPA mapping (with stress-based vowel length)
+ARPABET_TO_IPA = {
+    # Vowels - primary stress (1) = long vowels
+    'AA': 'ɑ',    'AA0': 'ɑ',    'AA1': 'ɑː',   'AA2': 'ɑ',
+    'AE': 'æ',    'AE0': 'æ',    'AE1': 'æ',    'AE2': 'æ',
+    'AH': 'ʌ',    'AH0': 'ə',    'AH1': 'ʌ',    'AH2': 'ʌ',
+    'AO': 'ɔ',    'AO0': 'ɔ',    'AO1': 'ɔː',   'AO2': 'ɔ',
+    'AW': 'aʊ',   'AW0': 'aʊ',   'AW1': 'aʊ',   'AW2': 'aʊ',
+    'AY': 'aɪ',   'AY0': 'aɪ',   'AY1': 'aɪ',   'AY2': 'aɪ',
+    'EH': 'ɛ',    'EH0': 'ɛ',    'EH1': 'ɛ',    'EH2': 'ɛ',
+    'ER': 'ɜːr',  'ER0': 'ər',   'ER1': 'ɝː',   'ER2': 'ɜːr',
+    'EY': 'eɪ',   'EY0': 'eɪ',   'EY1': 'eɪ',   'EY2': 'eɪ',
+    'IH': 'ɪ',    'IH0': 'ɪ',    'IH1': 'ɪ',    'IH2': 'ɪ',
+    'IY': 'i',    'IY0': 'i',    'IY1': 'iː',   'IY2': 'i',
+    'OW': 'oʊ',   'OW0': 'oʊ',   'OW1': 'oʊ',   'OW2': 'oʊ',
+    'OY': 'ɔɪ',   'OY0': 'ɔɪ',   'OY1': 'ɔɪ',   'OY2': 'ɔɪ',
+    'UH': 'ʊ',    'UH0': 'ʊ',    'UH1': 'ʊ',    'UH2': 'ʊ',
+    'UW': 'u',    'UW0': 'u',    'UW1': 'uː',   'UW2': 'u',
+
+    # Consonants
+    'B': 'b',   'CH': 'ʧ',  'D': 'd',   'DH': 'ð',
+    'F': 'f',   'G': 'g',   'HH': 'h',  'JH': 'ʤ',
+    'K': 'k',   'L': 'l',   'M': 'm',   'N': 'n',
+    'NG': 'ŋ',  'P': 'p',   'R': 'r',   'S': 's',
+    'SH': 'ʃ',  'T': 't',   'TH': 'θ',  'V': 'v',
+    'W': 'w',   'Y': 'j',   'Z': 'z',   'ZH': 'ʒ',
+}
+
+# Manual overrides for singing pronunciation (compiled into the lexicon)
+SINGING_OVERRIDES = {
+    "used": "uːzd",  # Remove initial j for singing (juːzd → uːzd)
+    "to": "tuː",     # Always long u: for singing
+}
+
+# Compiled lexicon file format
+MAGIC = b'FNLX'
+FORMAT_VERSION = 2
+BYTE_ORDER_CHECK = 0x01020304
+HEADER = struct.Struct('<4sIIIIII20s')  # magic, version, bom, count, slots, key/val blob size, sha1
+VARIANT_SEP = '\x1f'
+
+# Default location of the compiled lexicon (override with FONETIZER_LEXICON)
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cmu_ipa.lex')
+
+
+# Interned phoneme symbols: every ARPABET symbol seen so far maps straight to
+# its IPA, including stress variants missing from ARPABET_TO_IPA (resolved to
+# their base symbol once, on first sight). Converting a pronunciation is then
+# a single table probe per phoneme.
+IPA_BY_SYMBOL = dict(ARPABET_TO_IPA)
+
+
+def intern_phoneme(phoneme: str) -> str:
+    """
+    Return the IPA of an ARPABET symbol, interning unseen stress variants.
+
+    A symbol missing from ARPABET_TO_IPA (e.g. an unexpected stress digit) is
+    mapped to the IPA of its base symbol and remembered; unknown symbols map
+    to the empty string.
+    """
+    ipa = IPA_BY_SYMBOL.get(phoneme)
+    if ipa is None:
+        # Try without stress marker
+        base = ''.join([c for c in phoneme if not c.isdigit()])
+        ipa = IPA_BY_SYMBOL[phoneme] = ARPABET_TO_IPA.get(base, '')
+    return ipa
+
+
+def arpabet_to_ipa(arpabet_list: List[str]) -> str:
+    """Convert ARPABET phonemes to IPA string"""
+    table = IPA_BY_SYMBOL
+    ipa = ""
+    try:
+        for phoneme in arpabet_list:
+            ipa += table[phoneme]
+    except KeyError:
+        ipa = "".join([intern_phoneme(phoneme) for phoneme in arpabet_list])
+    return ipa
+
+
+def lexicon_fingerprint() -> bytes:
+    """
+    Fingerprint of everything that goes into a compiled lexicon.
+
+    A compiled file whose fingerprint differs (new cmudict release, edited
+    ARPABET table or overrides, new file format) is stale and gets rebuilt.
+    """
+    import cmudict
+
+    h = hashlib.sha1()
+    h.update(f"format={FORMAT_VERSION};cmudict={cmudict.__version__};".encode('utf-8'))
+    h.update(repr(sorted(ARPABET_TO_IPA.items())).encode('utf-8'))
+    h.update(repr(sorted(SINGING_OVERRIDES.items())).encode('utf-8'))
+    return h.digest()
+
+
+def compile_entries() -> Dict[str, List[str]]:
+    """
+    Convert the whole CMU dictionary (plus overrides) to IPA.
+
+    Returns:
+        Dict of word -> list of IPA pronunciations, CMU order preserved
+    """
+    import cmudict
+
+    entries: Dict[str, List[str]] = {}
+    for word, arpabet in cmudict.entries():
+        entries.setdefault(word, []).append(arpabet_to_ipa(arpabet))
+
+    for word, ipa in SINGING_OVERRIDES.items():
+        entries[word] = [ipa]
+
+    return entries
+
+
+def compile_lexicon(path: Optional[str] = None) -> str:
+    """
+    Compile the CMU dictionary into a memory-mappable lexicon file.
+
+    Args:
+        path: Destination file (default: DEFAULT_LEXICON_PATH)
+
+    Returns:
+        Path of the written lexicon
+    """
+    return write_lexicon(path or DEFAULT_LEXICON_PATH, compile_entries(), lexicon_fingerprint())
+
+
+def write_lexicon(path: str, entries: Dict[str, List[str]], fingerprint: bytes) -> str:
+    """
+    Write key -> values entries as a memory-mappable lexicon file.
+
+    The file is written next to its destination and moved into place
+    atomically, so concurrent readers never see a half-written lexicon.
+
+    Args:
+        path: Destination file
+        entries: Dict of key -> list of values (joined with VARIANT_SEP)
+        fingerprint: 20-byte digest of the inputs, stored in the header
+
+    Returns:
+        path
+    """
+    keys = sorted(word.encode('utf-8') for word in entries)
+
+    key_offsets = [0]
+    val_offsets = [0]
+    values = []
+    for key in keys:
+        key_offsets.append(key_offsets[-1] + len(key))
+        value = VARIANT_SEP.join(entries[key.decode('utf-8')]).encode('utf-8')
+        values.append(value)
+        val_offsets.append(val_offsets[-1] + len(value))
+
+    key_blob = b''.join(keys)
+    val_blob = b''.join(values)
+    count = len(keys)
+
+    # Hash slots: power of two, at most half full, linear probing
+    slot_count = 1
+    while slot_count < 2 * count:
+        slot_count *= 2
+    mask = slot_count - 1
+    slots = [0] * slot_count
+    for idx, key in enumerate(keys):
+        h = zlib.crc32(key) & mask
+        while slots[h]:
+            h = (h + 1) & mask
+        slots[h] = idx + 1
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER_CHECK, count, slot_count,
+                         len(key_blob), len(val_blob), fingerprint)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(struct.pack(f'<{count + 1}I', *key_offsets))
+            f.write(struct.pack(f'<{count + 1}I', *val_offsets))
+            f.write(struct.pack(f'<{slot_count}I', *slots))
+            f.write(key_blob)
+            f.write(val_blob)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return path
+
+
+class Lexicon:
+    """
+    Read-only, memory-mapped word -> IPA lexicon.
+
+    Supports `word in lexicon`, `lexicon[word]` (first pronunciation),
+    `lexicon.get(word)`, `lexicon.variants(word)` and `lexicon.words()`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, bom, count, slot_count, key_size, val_size, fingerprint = \
+                HEADER.unpack_from(self._mm, 0)
+        except struct.error:
+            self._mm.close()
+            raise ValueError(f"Not a Fonetizer lexicon: {path}")
+
+        if magic != MAGIC or version != FORMAT_VERSION or bom != BYTE_ORDER_CHECK:
+            self._mm.close()
+            raise ValueError(f"Not a Fonetizer lexicon (format {FORMAT_VERSION}): {path}")
+
+        self.fingerprint = fingerprint
+        self.count = count
+        self._mask = slot_count - 1
+
+        # word -> first pronunciation, for the words looked up so far (at
+        # most the words of the lexicon, in practice a few thousand)
+        self._decoded: Dict[str, str] = {}
+
+        offsets_size = 4 * (count + 1)
+        key_off_start = HEADER.size
+        val_off_start = key_off_start + offsets_size
+        slots_start = val_off_start + offsets_size
+        self._key_start = slots_start + 4 * slot_count
+        self._val_start = self._key_start + key_size
+
+        if self._val_start + val_size != len(self._mm):
+            self._mm.close()
+            raise ValueError(f"Truncated Fonetizer lexicon: {path}")
+
+        self._view = None
+        if sys.byteorder == 'little':
+            self._view = memoryview(self._mm)
+            self._key_offsets = self._view[key_off_start:val_off_start].cast('I')
+            self._val_offsets = self._view[val_off_start:slots_start].cast('I')
+            self._slots = self._view[slots_start:self._key_start].cast('I')
+        else:
+            self._key_offsets = struct.unpack_from(f'<{count + 1}I', self._mm, key_off_start)
+            self._val_offsets = struct.unpack_from(f'<{count + 1}I', self._mm, val_off_start)
+            self._slots = struct.unpack_from(f'<{slot_count}I', self._mm, slots_start)
+
+    def _find(self, word: str) -> int:
+        """Return the entry index of word, or -1"""
+        key = word.encode()
+        mm = self._mm
+        slots = self._slots
+        key_offsets = self._key_offsets
+        key_start = self._key_start
+        mask = self._mask
+
+        h = zlib.crc32(key) & mask
+        while True:
+            idx = slots[h]
+            if not idx:
+                return -1
+            if mm[key_start + key_offsets[idx - 1]:key_start + key_offsets[idx]] == key:
+                return idx - 1
+            h = (h + 1) & mask
+
+    def _key(self, idx: int) -> str:
+        start = self._key_start + self._key_offsets[idx]
+        end = self._key_start + self._key_offsets[idx + 1]
+        return self._mm[start:end].decode('utf-8')
+
+    def _value(self, idx: int) -> str:
+        start = self._val_start + self._val_offsets[idx]
+        end = self._val_start + self._val_offsets[idx + 1]
+        return self._mm[start:end].decode('utf-8')
+
+    def variants(self, word: str) -> Tuple[str, ...]:
+        """All IPA pronunciations of word, in CMU order (empty if unknown)"""
+        idx = self._find(word)
+        if idx < 0:
+            return ()
+        return tuple(self._value(idx).split(VARIANT_SEP))
+
+    def multi_variant_entries(self) -> Iterator[Tuple[str, Tuple[str, ...]]]:
+        """
+        Iterate over (word, variants) for the words with more than one
+        pronunciation, in sorted order.
+
+        Found by scanning the value blob for separators, so the (far more
+        numerous) single-pronunciation entries are never decoded.
+        """
+        sep = VARIANT_SEP.encode('utf-8')
+        mm = self._mm
+        val_start = self._val_start
+        val_offsets = self._val_offsets
+        end = len(mm)
+        pos = mm.find(sep, val_start)
+        while pos >= 0:
+            idx = bisect.bisect_right(val_offsets, pos - val_start) - 1
+            yield self._key(idx), tuple(self._value(idx).split(VARIANT_SEP))
+            pos = mm.find(sep, val_start + val_offsets[idx + 1], end)
+
+    def get(self, word: str, default: Optional[str] = None) -> Optional[str]:
+        """First (most common) IPA pronunciation of word"""
+        ipa = self._decoded.get(word)
+        if ipa is not None:
+            return ipa
+        idx = self._find(word)
+        if idx < 0:
+            return default
+        value = self._value(idx)
+        sep = value.find(VARIANT_SEP)
+        ipa = self._decoded[word] = value if sep < 0 else value[:sep]
+        return ipa
+
+    def __getitem__(self, word: str) -> str:
+        ipa = self.get(word)
+        if ipa is None:
+            raise KeyError(word)
+        return ipa
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._decoded or self._find(word) >= 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def words(self) -> Iterator[str]:
+        """Iterate over all words, in sorted (bytewise) order"""
+        for idx in range(self.count):
+            yield self._key(idx)
+
+    def close(self):
+        """Release the memory map"""
+        self._decoded.clear()
+        if self._view is not None:
+            self._key_offsets.release()
+            self._val_offsets.release()
+            self._slots.release()
+            self._view.release()
+        self._mm.close()
+
+
+def load_lexicon(path: Optional[str] = None) -> Lexicon:
+    """
+    Open the compiled lexicon, (re)building it first if missing or stale.
+
+    Lookup order for the file: explicit path, $FONETIZER_LEXICON, then
+    DEFAULT_LEXICON_PATH. If the default location is not writable the
+    lexicon is built in the system temp directory instead.
+    """
+    path = path or os.environ.get('FONETIZER_LEXICON') or DEFAULT_LEXICON_PATH
+    return open_compiled(path, lexicon_fingerprint(), compile_lexicon)
+
+
+def open_compiled(path: str, fingerprint: bytes, build: Callable[[str], str]) -> Lexicon:
+    """
+    Open the lexicon file at path if its fingerprint matches, else build it.
+
+    If path is not writable, the file is built (and looked for) in the
+    system temp directory instead.
+
+    Args:
+        path: Preferred location of the compiled file
+        fingerprint: Fingerprint an up-to-date file must have
+        build: Called with the destination path to write the file, returns it
+    """
+    fallback_path = os.path.join(tempfile.gettempdir(), os.path.basename(path))
+
+    # Use an up-to-date compiled file if there is one
+    for candidate in (path, fallback_path):
+        try:
+            lexicon = Lexicon(candidate)
+        except (OSError, ValueError):
+            continue
+        if lexicon.fingerprint == fingerprint:
+            return lexicon
+        lexicon.close()
+
+    try:
+        path = build(path)
+    except OSError:
+        path = build(fallback_path)
+
+    return Lexicon(path)
+
+
+def main():
+    """Build the compiled lexicon"""
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    path = compile_lexicon(path)
+    lexicon = Lexicon(path)
+    size_kb = os.path.getsize(path) / 1024
+    print(f"Lexicon compiled: {path} ({len(lexicon)} words, {size_kb:.0f} KB)", file=sys.stderr)
+    lexicon.close()
+
+
+if __name__ == '__main__':
+    main()
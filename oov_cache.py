@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of out-of-vocabulary pronunciations
+
+Stores what the eng_to_ipa fallback (or the last-resort echo) produced for
+words missing from the lexicon, so repeated runs over the same catalogue do
+not convert the same misses again. Entries are keyed by normalized word and
+converter version; upgrading eng_to_ipa simply starts a new set of entries.
+
+The cache is a SQLite database in WAL mode, safe to share between several
+worker processes. Enable it in the pipeline with FONETIZER_OOV_DB=path or
+fonetizer.set_persistent_oov_cache(path).
+
+Usage:
+    python oov_cache.py stats
+    python oov_cache.py list [--limit N]
+    python oov_cache.py prune [--older-than DAYS] [--all]
+    python oov_cache.py --db path/to/cache.sqlite stats
+"""
+
+import sys
+import os
+import time
+import sqlite3
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Default database location (override with FONETIZER_OOV_DB)
+DEFAULT_OOV_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'oov_cache.sqlite')
+
+# Bump when the post-processing of fallback results changes
+# (2: words eng_to_ipa cannot transcribe get the G2P guess)
+POSTPROCESS_VERSION = 2
+
+# Max words per SELECT (SQLite bind variable limit is 999 on older builds)
+QUERY_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS oov (
+    word     TEXT NOT NULL,
+    version  TEXT NOT NULL,
+    ipa      TEXT NOT NULL,
+    created  REAL NOT NULL,
+    PRIMARY KEY (word, version)
+) WITHOUT ROWID
+"""
+
+
+def converter_version() -> str:
+    """Version tag of the fallback converter used to key cache entries"""
+    from importlib import metadata
+
+    try:
+        eng_to_ipa_version = metadata.version('eng-to-ipa')
+    except metadata.PackageNotFoundError:
+        eng_to_ipa_version = 'unknown'
+    return f"eng_to_ipa-{eng_to_ipa_version}/{POSTPROCESS_VERSION}"
+
+
+class PersistentOOVCache:
+    """
+    SQLite-backed word -> IPA cache for out-of-vocabulary words.
+
+    One connection per process (reopened after fork) guarded by a lock, so
+    the same object can be used from Streamlit's script threads and from
+    forked pool workers.
+    """
+
+    def __init__(self, path: Optional[str] = None, version: Optional[str] = None):
+        self.path = path or os.environ.get('FONETIZER_OOV_DB') or DEFAULT_OOV_DB_PATH
+        self.version = version or converter_version()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, word: str) -> Optional[str]:
+        return self.get_many([word]).get(word)
+
+    def get_many(self, words: Iterable[str]) -> Dict[str, str]:
+        """Look up many words at once, returns only the ones found"""
+        words = list(words)
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            for i in range(0, len(words), QUERY_CHUNK):
+                chunk = words[i:i + QUERY_CHUNK]
+                marks = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"SELECT word, ipa FROM oov WHERE version = ? AND word IN ({marks})",
+                    [self.version] + chunk
+                )
+                found.update(rows)
+        return found
+
+    def put(self, word: str, ipa: str):
+        self.put_many({word: ipa})
+
+    def put_many(self, results: Dict[str, str]):
+        """Store many results in a single transaction"""
+        if not results:
+            return
+        now = time.time()
+        rows = [(word, self.version, ipa, now) for word, ipa in results.items()]
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO oov (word, version, ipa, created) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def entries(self, limit: Optional[int] = None) -> List[Tuple[str, str, str, float]]:
+        """Return (word, version, ipa, created) rows, newest first"""
+        sql = "SELECT word, version, ipa, created FROM oov ORDER BY created DESC"
+        params = []
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def stats(self) -> Dict[str, object]:
+        """Entry counts per converter version and database size"""
+        with self._lock:
+            conn = self._connection()
+            versions = dict(conn.execute("SELECT version, COUNT(*) FROM oov GROUP BY version"))
+            oldest, newest = conn.execute("SELECT MIN(created), MAX(created) FROM oov").fetchone()
+        size = sum(os.path.getsize(self.path + suffix)
+                   for suffix in ('', '-wal') if os.path.exists(self.path + suffix))
+        return {
+            'path': self.path,
+            'current_version': self.version,
+            'entries': sum(versions.values()),
+            'versions': versions,
+            'oldest': oldest,
+            'newest': newest,
+            'size_bytes': size,
+        }
+
+    def prune(self, older_than_days: Optional[float] = None, prune_all: bool = False) -> int:
+        """
+        Delete cache entries.
+
+        Always removes entries of other converter versions; additionally
+        removes entries older than older_than_days, or everything if prune_all.
+
+        Returns:
+            Number of deleted entries
+        """
+        with self._lock:
+            conn = self._connection()
+            if prune_all:
+                deleted = conn.execute("DELETE FROM oov").rowcount
+            else:
+                deleted = conn.execute("DELETE FROM oov WHERE version != ?", (self.version,)).rowcount
+                if older_than_days is not None:
+                    cutoff = time.time() - older_than_days * 86400
+                    deleted += conn.execute("DELETE FROM oov WHERE created < ?", (cutoff,)).rowcount
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+def _format_time(timestamp: Optional[float]) -> str:
+    if timestamp is None:
+        return "-"
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))
+
+
+def main():
+    """Inspect and prune the persistent OOV cache"""
+    parser = argparse.ArgumentParser(description="Inspect and prune the Fonetizer OOV pronunciation cache")
+    parser.add_argument('--db', help="Cache database (default: $FONETIZER_OOV_DB or oov_cache.sqlite)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('stats', help="Show entry counts and size")
+
+    list_parser = sub.add_parser('list', help="List cached words, newest first")
+    list_parser.add_argument('--limit', type=int, default=50, help="Max rows (default: 50)")
+
+    prune_parser = sub.add_parser('prune', help="Delete stale entries (other converter versions)")
+    prune_parser.add_argument('--older-than', type=float, metavar='DAYS',
+                              help="Also delete entries older than DAYS")
+    prune_parser.add_argument('--all', action='store_true', help="Delete every entry")
+
+    args = parser.parse_args()
+    cache = PersistentOOVCache(args.db)
+
+    if args.command == 'stats':
+        stats = cache.stats()
+        print(f"Database:        {stats['path']}")
+        print(f"Size:            {stats['size_bytes'] / 1024:.0f} KB")
+        print(f"Entries:         {stats['entries']}")
+        print(f"Oldest / newest: {_format_time(stats['oldest'])} / {_format_time(stats['newest'])}")
+        for version, count in sorted(stats['versions'].items()):
+            marker = " (current)" if version == stats['current_version'] else ""
+            print(f"  {version}: {count}{marker}")
+    elif args.command == 'list':
+        for word, version, ipa, created in cache.entries(args.limit):
+            print(f"{word}\t{ipa}\t{version}\t{_format_time(created)}")
+    elif args.command == 'prune':
+        deleted = cache.prune(args.older_than, args.all)
+        print(f"Deleted {deleted} entries", file=sys.stderr)
+
+    cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Pronunciation variant selection for Fonetizer
+
+The lexicon keeps every CMU pronunciation of a word, most common first. A
+VariantIndex decides which one a word gets, in this order:
+
+    1. User overrides   from a pronunciations file, see load_overrides()
+    2. Context rules    words sung differently before a vowel ("the")
+    3. Policy           'first' (CMU order) or 'stressed' (fewest reduced
+                        vowels, most long ones; CMU order on ties)
+
+Everything that does not depend on the surrounding words is decided once,
+when the index is built: the policy's choice for each multi-pronunciation
+word and the overrides end up in one dict, so resolving a token is a dict
+probe plus (for the few words that have none) the usual lexicon lookup.
+Context rules are a second dict keyed by word, checked against the first
+sound of the next word.
+
+Policies:
+    first       CMU order, as without an index (default)
+    context     CMU order plus the context rules
+    stressed    stress-preferring, plus the context rules
+
+Pronunciations file (UTF-8, one word per line, '#' starts a comment):
+    the       ði            # an IPA pronunciation
+    live      2             # the 2nd CMU pronunciation (lexicon.variants order)
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+POLICIES = ('first', 'context', 'stressed')
+
+DEFAULT_POLICY = 'first'
+
+# word -> (before a vowel, before a consonant)
+CONTEXT_RULES: Dict[str, Tuple[str, str]] = {
+    'the': ('ði', 'ðə'),
+}
+
+# Reduced vowels and the length mark (only primary-stressed vowels are long),
+# as written by lexicon.ARPABET_TO_IPA
+REDUCED_VOWEL = 'ə'
+LONG_MARK = 'ː'
+
+
+def stress_score(ipa: str) -> int:
+    """How strongly a pronunciation is stressed: long vowels minus reduced ones"""
+    return ipa.count(LONG_MARK) - ipa.count(REDUCED_VOWEL)
+
+
+def load_overrides(path: str, lexicon=None) -> Dict[str, str]:
+    """
+    Read a pronunciations file.
+
+    Args:
+        path: File of "word pronunciation" lines (see the module docstring)
+        lexicon: Lexicon used to resolve variant numbers
+
+    Returns:
+        Dict of lowercased word -> IPA
+
+    Raises:
+        ValueError: On a malformed line or an unknown variant number
+    """
+    overrides = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            if len(fields) != 2:
+                raise ValueError(f"{path}:{line_num}: expected 'word pronunciation', got {line.strip()!r}")
+            word, pronunciation = fields[0].lower(), fields[1]
+            if pronunciation.isdigit():
+                variants = lexicon.variants(word) if lexicon is not None else ()
+                number = int(pronunciation)
+                if not 1 <= number <= len(variants):
+                    raise ValueError(f"{path}:{line_num}: {word!r} has {len(variants)} "
+                                     f"pronunciation(s), not {number}")
+                pronunciation = variants[number - 1]
+            overrides[word] = pronunciation
+    return overrides
+
+
+class VariantIndex:
+    """
+    Word -> chosen IPA for one policy and set of overrides, built once.
+
+    Supports `word in index` and `index.get(word)`; context_rules holds the
+    rules in force (word -> (before a vowel, before a consonant)).
+    """
+
+    def __init__(self, lexicon, policy: str = DEFAULT_POLICY, overrides: Optional[Dict[str, str]] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown pronunciation policy {policy!r} (choose from {', '.join(POLICIES)})")
+        self.lexicon = lexicon
+        self.policy = policy
+        self.overrides = dict(overrides or {})
+
+        # Only the words whose choice differs from the lexicon's first
+        # pronunciation are stored; the rest fall through to the lexicon
+        self._chosen: Dict[str, str] = {}
+        if policy == 'stressed':
+            for word, variants in lexicon.multi_variant_entries():
+                best = max(variants, key=stress_score)
+                if best != variants[0]:
+                    self._chosen[word] = best
+        self._chosen.update(self.overrides)
+
+        # Overridden words are not subject to context rules
+        self.context_rules: Dict[str, Tuple[str, str]] = {}
+        if policy != 'first':
+            self.context_rules = {word: rule for word, rule in CONTEXT_RULES.items()
+                                  if word not in self.overrides}
+
+    def get(self, word: str, default: Optional[str] = None) -> Optional[str]:
+        """Chosen IPA of a normalized word, ignoring context"""
+        ipa = self._chosen.get(word)
+        if ipa is None:
+            return self.lexicon.get(word, default)
+        return ipa
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._chosen or word in self.lexicon
+
+    def __repr__(self) -> str:
+        return (f"<VariantIndex: policy {self.policy}, {len(self._chosen)} chosen, "
+                f"{len(self.overrides)} overrides>")
+
+
+def index_from_environment(lexicon) -> VariantIndex:
+    """
+    Build the index configured by $FONETIZER_PRONUNCIATION_POLICY and
+    $FONETIZER_PRONUNCIATIONS (a pronunciations file), defaults otherwise.
+    """
+    policy = os.environ.get('FONETIZER_PRONUNCIATION_POLICY') or DEFAULT_POLICY
+    path = os.environ.get('FONETIZER_PRONUNCIATIONS')
+    overrides = load_overrides(path, lexicon) if path else None
+    return VariantIndex(lexicon, policy, overrides)
@@ -0,0 +1,201 @@
+"""
+Compact storage for syllabified phrases
+
+A document's syllables as (consonant, vowel) tuples cost a tuple and up to
+two small strings per syllable, mostly repeats of the same few dozen vowels
+and clusters. SyllableTable stores them column-wise instead: every distinct
+string is interned once per table and each syllable is two symbol ids in
+array-backed columns, with phrase boundaries kept as offsets.
+
+Layout:
+    starts      start measure per phrase
+    offsets     len + 1 positions, phrase i is offsets[i]:offsets[i + 1]
+    consonants  symbol id per syllable ('H', widened to 'I' if needed)
+    vowels      symbol id per syllable
+    symbols     id -> string
+
+For compatibility a table behaves like the List[(start, syllables)] the
+writers used to take: indexing gives (start, PhraseSyllables), a read-only
+view that in turn behaves like a list of (consonant, vowel) tuples.
+"""
+
+from array import array
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Largest symbol id storable in the initial 'H' columns
+_MAX_SHORT_ID = 0xFFFF
+
+
+class PhraseSyllables:
+    """Read-only view of one phrase's syllables, like a list of (consonant, vowel)"""
+
+    __slots__ = ('_table', '_begin', '_end')
+
+    def __init__(self, table: 'SyllableTable', begin: int, end: int):
+        self._table = table
+        self._begin = begin
+        self._end = end
+
+    def __len__(self) -> int:
+        return self._end - self._begin
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("syllable index out of range")
+        table = self._table
+        pos = self._begin + index
+        return table.symbols[table.consonants[pos]], table.symbols[table.vowels[pos]]
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        table = self._table
+        symbols = table.symbols
+        for pos in range(self._begin, self._end):
+            yield symbols[table.consonants[pos]], symbols[table.vowels[pos]]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (PhraseSyllables, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == tuple(b) for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class SyllableTable:
+    """
+    Syllables of many phrases in interned, array-backed columns.
+
+    Build with append()/extend() or from_phrases(); read like a list of
+    (start_measure, syllables). Writers use the columns directly.
+    """
+
+    __slots__ = ('starts', 'offsets', 'consonants', 'vowels', 'symbols', '_symbol_ids')
+
+    def __init__(self):
+        self.starts: List[str] = []
+        self.offsets = array('I', [0])
+        self.consonants = array('H')
+        self.vowels = array('H')
+        self.symbols: List[str] = ['']
+        self._symbol_ids = {'': 0}
+
+    @classmethod
+    def from_phrases(cls, phrases: Iterable[Tuple[str, Sequence[Tuple[str, str]]]]) -> 'SyllableTable':
+        """Build a table from (start_measure, syllables) pairs (a table is returned as is)"""
+        if isinstance(phrases, SyllableTable):
+            return phrases
+        table = cls()
+        table.extend(phrases)
+        return table
+
+    def intern(self, symbol: str) -> int:
+        """Id of a consonant cluster or vowel string, adding it if new"""
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            if symbol_id > _MAX_SHORT_ID and self.consonants.typecode == 'H':
+                self.consonants = array('I', self.consonants)
+                self.vowels = array('I', self.vowels)
+            self.symbols.append(symbol)
+            self._symbol_ids[symbol] = symbol_id
+        return symbol_id
+
+    def append(self, start: str, syllables: Iterable[Tuple[str, str]]):
+        """Add one phrase"""
+        intern = self.intern
+        for consonant, vowel in syllables:
+            self.consonants.append(intern(consonant))
+            self.vowels.append(intern(vowel))
+        self.starts.append(start)
+        self.offsets.append(len(self.consonants))
+
+    def extend(self, phrases: Iterable[Tuple[str, Iterable[Tuple[str, str]]]]):
+        for start, syllables in phrases:
+            self.append(start, syllables)
+
+    def phrase_length(self, index: int) -> int:
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def _range(self, begin: int, end: Optional[int]) -> range:
+        return range(*slice(begin, end).indices(len(self.starts)))
+
+    def max_syllables(self, begin: int = 0, end: Optional[int] = None) -> int:
+        """Syllables in the longest phrase of phrases[begin:end] (0 if there are none)"""
+        offsets = self.offsets
+        return max((offsets[i + 1] - offsets[i] for i in self._range(begin, end)), default=0)
+
+    def column_widths(self, begin: int = 0, end: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Longest consonant and longest vowel string, per phrase of phrases[begin:end]"""
+        lengths = [len(symbol) for symbol in self.symbols]
+        consonants = self.consonants
+        vowels = self.vowels
+        offsets = self.offsets
+        widths = []
+        for i in self._range(begin, end):
+            first, last = offsets[i], offsets[i + 1]
+            widths.append((max((lengths[c] for c in consonants[first:last]), default=0),
+                           max((lengths[v] for v in vowels[first:last]), default=0)))
+        return widths
+
+    def transposed_rows(self, begin: int = 0, end: Optional[int] = None) -> List[List[str]]:
+        """
+        The transposed table body: row k holds the consonant and vowel of
+        syllable k of every phrase, "" where a phrase is shorter.
+
+        Filled column by column straight from the symbol id arrays, so only
+        actual syllables are visited and no tuples are created. begin and end
+        restrict it to phrases[begin:end] (one sheet of a split workbook).
+        """
+        symbols = self.symbols
+        consonants = self.consonants
+        vowels = self.vowels
+        offsets = self.offsets
+        phrases = self._range(begin, end)
+        rows = [[""] * (2 * len(phrases)) for _ in range(self.max_syllables(begin, end))]
+        col = 0
+        for i in phrases:
+            first, last = offsets[i], offsets[i + 1]
+            for row, consonant, vowel in zip(rows, consonants[first:last], vowels[first:last]):
+                row[col] = symbols[consonant]
+                row[col + 1] = symbols[vowel]
+            col += 2
+        return rows
+
+    def nbytes(self) -> int:
+        """Approximate size of the columns and offsets (excluding symbol strings)"""
+        return sum(a.itemsize * len(a) for a in (self.offsets, self.consonants, self.vowels))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SyllableTable.from_phrases(self[i] for i in range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("phrase index out of range")
+        return self.starts[index], PhraseSyllables(self, self.offsets[index], self.offsets[index + 1])
+
+    def __iter__(self) -> Iterator[Tuple[str, PhraseSyllables]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (SyllableTable, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            start == other_start and syllables == other_syllables
+            for (start, syllables), (other_start, other_syllables) in zip(self, other)
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"<SyllableTable: {len(self)} phrases, {len(self.consonants)} syllables, {len(self.symbols)} symbols>"
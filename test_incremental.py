@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental rebuilds (batch.py --incremental)
+
+Run with: python -m pytest test_incremental.py
+"""
+import os
+import sys
+import subprocess
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_batch_cli(*args, cwd):
+    return subprocess.run([sys.executable, os.path.join(HERE, 'batch.py'), *args],
+                          cwd=cwd, capture_output=True, text=True)
+
+
+@pytest.mark.parametrize('content', ['', '\n\n  \n'], ids=['empty', 'blank-lines'])
+def test_empty_input_same_as_plain_batch(tmp_path, content):
+    input_path = tmp_path / 'song.txt'
+    input_path.write_text(content, encoding='utf-8')
+
+    plain = run_batch_cli(str(input_path), '-o', 'plain', '-f', 'jsonl', cwd=tmp_path)
+    incremental = run_batch_cli(str(input_path), '-o', 'incremental', '-f', 'jsonl', '--incremental',
+                                cwd=tmp_path)
+
+    assert plain.returncode == 0, plain.stdout + plain.stderr
+    assert incremental.returncode == 0, incremental.stdout + incremental.stderr
+    assert (tmp_path / 'plain' / 'song.jsonl').read_bytes() == b''
+    assert (tmp_path / 'incremental' / 'song.jsonl').read_bytes() == b''
+
+    # A second run finds the empty output up to date
+    again = run_batch_cli(str(input_path), '-o', 'incremental', '-f', 'jsonl', '--incremental', cwd=tmp_path)
+    assert again.returncode == 0, again.stdout + again.stderr
+    assert 'FAILED' not in again.stdout + again.stderr